@@ -1,9 +1,9 @@
 import re
+import asyncio
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, BaseMessage
 from langchain_core.tools import tool, Tool
@@ -11,12 +11,103 @@ from serpapi import GoogleSearch
 from dotenv import load_dotenv
 import logging
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from etl_processor import ETLProcessor
+from gazetteer import Gazetteer
+from ingestion import IngestionQueue, IngestionQueueFull
+from search_cache import DiskSearchCache, SearchCache, TieredSearchCache, make_cache_key
+from single_flight import SingleFlight
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from json_stream import ArrayItemParser, conform_to_schema, extract_validated_object
+from llm_clients import LLMClientRegistry
+from locations import AirportCodeResolver, location_index
+from markdown_stream import MarkdownStreamCleaner, clean_markdown
 
 load_dotenv()
 
+# Upper bound for a single SerpAPI lookup before the search node gives up on it
+SEARCH_TIMEOUT_SECONDS = float(os.getenv("SEARCH_TIMEOUT_SECONDS", "25"))
+
+# SerpAPI's client is blocking, so lookups run on a bounded pool instead of the event loop
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "16"))
+search_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="serpapi")
+
+# Shared cache of raw SerpAPI responses so hot routes don't spend quota on repeat lookups.
+# The SQLite tier is shared by every uvicorn worker and survives restarts and --reload.
+search_cache = TieredSearchCache(
+    SearchCache(
+        ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "900")),
+        max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "512")),
+        max_bytes=int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    ),
+    DiskSearchCache(
+        os.getenv("SEARCH_CACHE_DB_PATH", os.path.join(os.path.dirname(__file__), 'data', 'search_cache.db')),
+        ttl_seconds=float(os.getenv("SEARCH_CACHE_DISK_TTL_SECONDS", "3600")),
+        compaction_interval=float(os.getenv("SEARCH_CACHE_COMPACTION_INTERVAL_SECONDS", "300"))
+    ) if os.getenv("SEARCH_CACHE_DISK_ENABLED", "true").lower() == "true" else None
+)
+
+# Identical concurrent searches (and optionally identical plan requests) share one upstream call
+search_flights = SingleFlight()
+plan_flights = SingleFlight()
+COALESCE_PLAN_REQUESTS = os.getenv("COALESCE_PLAN_REQUESTS", "true").lower() == "true"
+
+# One pooled OpenAI client shared by the planner and the chat routes, so keep-alive connections are reused
+llm_registry = LLMClientRegistry(
+    max_connections=int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10")),
+    keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "60")),
+    timeout=float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "60"))
+)
+
+# City -> IATA code, answered offline where possible; SerpAPI results and misses are cached with TTLs
+airport_resolver = AirportCodeResolver(
+    location_index,
+    ttl_seconds=float(os.getenv("AIRPORT_CODE_TTL_SECONDS", "86400")),
+    negative_ttl_seconds=float(os.getenv("AIRPORT_CODE_NEGATIVE_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("AIRPORT_CODE_CACHE_MAX_ENTRIES", "1024"))
+)
+
+# Gazetteers for tagging generated activities. Phrases match as case-insensitive substrings and the
+# first one listed wins when several occur, so put more specific phrases before general ones.
+DUBAI_AREAS = {
+    "burj khalifa": "Downtown Dubai",
+    "dubai mall": "Downtown Dubai",
+    "palm jumeirah": "Palm Jumeirah",
+    "burj al arab": "Jumeirah",
+    "gold souk": "Deira",
+    "dubai marina": "Dubai Marina",
+    "dubai frame": "Zabeel",
+    "dubai creek": "Deira",
+    "jumeirah beach": "Jumeirah",
+    "mall of emirates": "Al Barsha",
+    "dubai miracle garden": "Al Barsha South",
+    "global village": "Dubailand",
+    "dubai opera": "Downtown Dubai",
+    "city walk": "Al Wasl",
+    "la mer": "Jumeirah",
+    "dubai water canal": "Business Bay",
+    "dubai design district": "Business Bay",
+    "dubai international airport": "Airport Area",
+    "ibn battuta mall": "Jebel Ali",
+    "dubai festival city": "Festival City"
+}
+
+ACTIVITY_TYPE_KEYWORDS = {
+    'meal': ['breakfast', 'lunch', 'dinner', 'restaurant', 'dining'],
+    'sightseeing': ['visit', 'explore', 'tour', 'see'],
+    'shopping': ['shop', 'market', 'store'],
+    'transport': ['depart', 'arrive', 'check-in', 'check-out'],
+    'cultural': ['temple', 'shrine', 'museum', 'ceremony'],
+    'nature': ['park', 'garden', 'mountain', 'forest']
+}
+
+# Compiled once; matching scans an activity string once however large the gazetteers grow
+dubai_area_matcher = Gazetteer(DUBAI_AREAS.items(), default="Dubai")
+activity_type_matcher = Gazetteer.from_groups(ACTIVITY_TYPE_KEYWORDS, default='activity')
+
 app = FastAPI()
 
 app.add_middleware(
@@ -51,6 +142,73 @@ class TravelPlanResponse(BaseModel):
     flights: Optional[List[Dict[str, Any]]]
     hotels: Optional[List[Dict[str, Any]]]
 
+ITINERARY_PROMPT = """You are Sayih, a Dubai travel planning assistant. Using the traveller's request and the flight and hotel data provided, create a detailed Dubai itinerary.
+Focus on:
+1. Popular Dubai attractions (Burj Khalifa, Dubai Mall, Palm Jumeirah, etc.)
+2. Local cultural experiences (Gold Souk, Al Fahidi, etc.)
+3. Modern entertainment (Dubai Frame, Museum of the Future, etc.)
+4. Luxury experiences (Desert safaris, yacht tours, etc.)
+
+Base flight_cost and hotel_cost on the flight and hotel options above when they are available.
+
+RESPOND ONLY WITH VALID JSON in the following format, no additional text or explanations:
+{
+    "budget_analysis": {
+        "total_budget": float,
+        "flight_cost": float,
+        "hotel_cost": float,
+        "remaining_budget": float
+    },
+    "daily_itinerary": [
+        {
+            "day": int,
+            "activities": [
+                {
+                    "time": "HH:MM AM/PM",
+                    "title": string,
+                    "description": string,
+                    "location": string,
+                    "area": string,
+                    "price": float,
+                    "tip": string,
+                    "category": string
+                }
+            ]
+        }
+    ]
+}
+
+Important:
+1. Include practical tips about dress code, customs, and weather
+2. Consider prayer times and Ramadan if applicable
+3. Account for Dubai's climate in activity planning
+4. Include transportation recommendations
+5. Suggest dining options for each day
+"""
+
+# Mirrors the JSON format in ITINERARY_PROMPT; numbers may come back as ints, floats or numeric
+# strings, which conform_to_schema converts
+NUMBER = (int, float)
+ITINERARY_SCHEMA = {
+    "budget_analysis": {
+        "total_budget": NUMBER,
+        "flight_cost": NUMBER,
+        "hotel_cost": NUMBER,
+        "remaining_budget": NUMBER
+    },
+    "daily_itinerary": [{
+        "day": int,
+        "activities": [{
+            "time": str,
+            "title": str,
+            "description": str,
+            "location": str,
+            "price": NUMBER
+        }]
+    }]
+}
+DAY_SCHEMA = ITINERARY_SCHEMA["daily_itinerary"][0]
+
 class AgentState(dict):
     """State definition for the agent."""
     messages: List[BaseMessage]
@@ -70,26 +228,21 @@ class Agent:
             )
         ]
         
-        self.llm = ChatOpenAI(
-            temperature=0.7,
-            model="gpt-4o"
-        )
+        self.llm = llm_registry.get_chat_model(model="gpt-4o", temperature=0.7)
         
         # Define the workflow graph
         workflow = StateGraph(AgentState)
         
-        # Add nodes
-        workflow.add_node("plan_trip", self.plan_trip)
+        # Add nodes: search first, then a single itinerary generation grounded in the results
         workflow.add_node("search_travel", self.search_travel)
         workflow.add_node("create_itinerary", self.create_itinerary)
         
         # Add edges
-        workflow.add_edge("plan_trip", "search_travel")
         workflow.add_edge("search_travel", "create_itinerary")
         workflow.add_edge("create_itinerary", END)
         
         # Set entry point
-        workflow.set_entry_point("plan_trip")
+        workflow.set_entry_point("search_travel")
         
         self.graph = workflow.compile()
 
@@ -128,8 +281,7 @@ class Agent:
             
             logging.info(f"Making flight API call with params: {api_params}")
             
-            search = GoogleSearch(api_params)
-            results = search.get_dict()
+            results = self._cached_search(api_params)
             logging.info(f"Complete raw SerpAPI flight response: {json.dumps(results, indent=2)}")
             if 'error' in results:
                 logging.error(f"SerpAPI Flight Error: {results['error']}")
@@ -185,8 +337,7 @@ class Agent:
             
             logging.info(f"Making hotel API call with params: {api_params}")
             
-            search = GoogleSearch(api_params)
-            results = search.get_dict()
+            results = self._cached_search(api_params)
             
             if 'error' in results:
                 logging.error(f"SerpAPI Hotel Error: {results['error']}")
@@ -217,205 +368,55 @@ class Agent:
             logging.error(f"Hotel search error: {str(e)}")
             return json.dumps({"error": str(e)})
 
+    def _cached_search(self, api_params: dict) -> Dict[str, Any]:
+        """Run a SerpAPI search through the shared result cache"""
+        key = make_cache_key(api_params)
+        cached = search_cache.get(key)
+        if cached is not None:
+            logging.info(f"Search cache hit for {api_params.get('engine')}")
+            return json.loads(cached)
+
+        results = GoogleSearch(api_params).get_dict()
+        # Only cache successful lookups so transient upstream errors are retried
+        if 'error' not in results:
+            search_cache.set(key, json.dumps(results))
+        return results
+
     def _get_airport_code(self, city: str) -> str:
         """Convert city name to IATA airport code"""
-        # Common airport codes mapping
-        airport_codes = {
-            "london": "LHR",  # London Heathrow
-            "paris": "CDG",   # Paris Charles de Gaulle
-            "new york": "JFK", # New York JFK
-            "tokyo": "HND",   # Tokyo Haneda
-            "dubai": "DXB",   # Dubai International
-            "singapore": "SIN", # Singapore Changi
-            "bali": "DPS", # Bali Ngurah Rai
-            "san francisco": "SFO", # San Francisco International
-            "new delhi": "DEL", # Delhi Indira Gandhi International
-            "delhi": "DEL",
-            "mumbai": "BOM", # Mumbai Chhatrapati Shivaji International
-            "beijing": "PEK", # Beijing Capital International
-            "seoul": "ICN", # Seoul Incheon International
-            "sydney": "SYD", # Sydney International
-            "melbourne": "MEL", # Melbourne Airport
-            "perth": "PER", # Perth International
-            "brisbane": "BNE", # Brisbane International
-            "canberra": "CBR", # Canberra International
-            "adelaide": "ADL", # Adelaide Airport
-            "gold coast": "OOL", # Gold Coast Airport
-            "newcastle": "NTL", # Newcastle Airport
-            "wollongong": "WOL", # Wollongong Airport
-            "san diego": "SAN", # San Diego International
-            "abu dhabi": "AUH", # Abu Dhabi International
-            "amman": "AMM", # Amman Civil Airport
-            "amsterdam": "AMS", # Amsterdam Airport Schiphol
-            "antalya": "AYT", # Antalya Airport
-            "athens": "ATH", # Athens International Airport
-            "barcelona": "BCN", # Barcelona El Prat Airport
-            "berlin": "BER", # Berlin Brandenburg Airport
-            "birmingham": "BHX", # Birmingham Airport
-            "brussels": "BRU", # Brussels Airport
-            "bucharest": "OTP", # Bucharest Henri Coanda International Airport
-            "budapest": "BUD", # Budapest Ferenc Liszt International Airport
-            "copenhagen": "CPH", # Copenhagen Airport
-            "dublin": "DUB", # Dublin Airport
-            "edinburgh": "EDI", # Edinburgh Airport
-            "frankfurt": "FRA", # Frankfurt Airport
-            "geneva": "GVA", # Geneva Airport
-            "glasgow": "GLA", # Glasgow Airport
-            "helsinki": "HEL", # Helsinki Vantaa Airport
-            "istanbul": "IST", # Istanbul Airport
-            "jerusalem": "JRS", # Jerusalem Airport
-            "kiev": "IEV", # Kiev Zhuliany International Airport
-            "lisbon": "LIS", # Lisbon Portela Airport
-            "london city": "LCY", # London City Airport
-            "madrid": "MAD", # Madrid Barajas Airport
-            "milan": "MXP", # Milan Malpensa Airport
-            "munich": "MUC", # Munich Airport
-        }
-        
-        city_lower = city.lower().strip()
-        if city_lower in airport_codes:
-            return airport_codes[city_lower]
-        
-        # If city not found in mapping, try to get it from SerpAPI location API
-        try:
-            locations = self.get_location(city, 1)
-            if locations and len(locations) > 0:
-                # Get the first airport result
-                for location in locations:
-                    if location.get("type") == "airport":
-                        return location.get("iata_code", city.upper())
-        except Exception as e:
-            logging.error(f"Error getting airport code: {str(e)}")
+        # The resolver answers from the bundled index, then from its caches of earlier SerpAPI lookups
+        code = airport_resolver.resolve(city, self._lookup_airport_code)
         
         # If all else fails, return uppercase city name
-        return city.upper()
-
-    def get_location(self, query: str, limit: int = 1) -> List[Dict]:
-        """Get location using SerpAPI Location API"""
-        try:
-            search = GoogleSearch({
-                "engine": "google_flights",
-                "api_key": os.getenv("SERPAPI_API_KEY"),
-                "q": query,
-                "limit": limit
-            })
-            locations = search.get_location()
-            return locations
-        except Exception as e:
-            logging.error(f"Error in get_location: {str(e)}")
-            return []
+        return code or city.upper()
 
-    def plan_trip(self, state: AgentState) -> AgentState:
-        """Initial planning step"""
-        try:
-            messages = state.get("messages", [])
-            last_message = messages[-1] if messages else None
-            
-            if isinstance(last_message, HumanMessage):
-                # Add more specific instructions to force JSON output
-                planning_prompt = SystemMessage(content="""You are Sayih, a Dubai travel planning assistant. 
-                RESPOND ONLY WITH VALID JSON in the following format, no additional text or explanations:
+    def _lookup_airport_code(self, city: str) -> Optional[str]:
+        """Find an airport code using the SerpAPI location API"""
+        locations = self.get_location(city, 1)
+        # Get the first airport result
+        for location in locations or []:
+            if location.get("type") == "airport":
+                return location.get("iata_code")
+        return None
 
-                {
-                    "budget_analysis": {
-                        "total_budget": float,
-                        "flight_cost": float,
-                        "hotel_cost": float,
-                        "remaining_budget": float
-                    },
-                    "daily_itinerary": [
-                        {
-                            "day": int,
-                            "activities": [
-                                {
-                                    "time": "HH:MM AM/PM",
-                                    "title": string,
-                                    "description": string,
-                                    "location": string,
-                                    "area": string,
-                                    "price": float,
-                                    "tip": string,
-                                    "category": string
-                                }
-                            ]
-                        }
-                    ]
-                }""")
+    def get_location(self, query: str, limit: int = 1) -> List[Dict]:
+        """Get location using SerpAPI Location API.
 
-                messages.append(planning_prompt)
-                
-                try:
-                    # Get response from OpenAI
-                    response = self.llm.invoke(messages)
-                    
-                    # Log the raw response for debugging
-                    logging.info(f"Raw OpenAI response: {response.content}")
-                    
-                    try:
-                        # Try to clean the response if it contains markdown or extra text
-                        content = response.content
-                        # Look for JSON content between triple backticks if present
-                        json_match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
-                        if json_match:
-                            content = json_match.group(1)
-                        
-                        # Remove any non-JSON text before or after
-                        content = re.sub(r'^[^{]*', '', content)
-                        content = re.sub(r'[^}]*$', '', content)
-                        
-                        # Parse the cleaned JSON
-                        itinerary_json = json.loads(content)
-                        
-                        # Validate the structure
-                        if not all(key in itinerary_json for key in ["budget_analysis", "daily_itinerary"]):
-                            raise ValueError("Missing required top-level keys")
-                        
-                        # Return the validated JSON response
-                        return {"messages": messages + [AIMessage(content=json.dumps(itinerary_json, ensure_ascii=False))]}
-                        
-                    except json.JSONDecodeError as je:
-                        logging.error(f"JSON Parse Error: {str(je)}")
-                        logging.error(f"Attempted to parse content: {content}")
-                        raise
-                        
-                except Exception as e:
-                    logging.error(f"Error generating itinerary: {str(e)}")
-                    raise
-                    
-        except Exception as e:
-            logging.error(f"Error in plan_trip: {str(e)}")
-            
-            # Return a fallback JSON response
-            fallback_json = {
-                "budget_analysis": {
-                    "total_budget": float(state.get("budget", 0)),
-                    "flight_cost": 0.0,
-                    "hotel_cost": 0.0,
-                    "remaining_budget": float(state.get("budget", 0))
-                },
-                "daily_itinerary": [
-                    {
-                        "day": 1,
-                        "activities": [
-                            {
-                                "time": "09:00 AM",
-                                "title": "Start of Day",
-                                "description": "We're preparing your Dubai itinerary",
-                                "location": "Dubai International Airport",
-                                "area": "Airport Area",
-                                "price": 0.0,
-                                "tip": "Please try again to get a complete Dubai itinerary",
-                                "category": "Transport"
-                            }
-                        ]
-                    }
-                ]
-            }
-            
-            return {"messages": state["messages"] + [AIMessage(content=json.dumps(fallback_json, ensure_ascii=False))]}
+        Request and API errors raise rather than returning [], so callers can tell an outage from no match.
+        """
+        search = GoogleSearch({
+            "engine": "google_flights",
+            "api_key": os.getenv("SERPAPI_API_KEY"),
+            "q": query,
+            "limit": limit
+        })
+        locations = search.get_location(query, limit)
+        if isinstance(locations, dict) and 'error' in locations:
+            raise RuntimeError(f"SerpAPI location error: {locations['error']}")
+        return locations
 
-    def search_travel(self, state: AgentState) -> AgentState:
-        """Search for flights and hotels to Dubai"""
+    async def search_travel(self, state: AgentState) -> AgentState:
+        """Search for flights and hotels to Dubai concurrently"""
         try:
             messages = state.get("messages", [])
             
@@ -475,8 +476,8 @@ class Agent:
                         departure = departure.group(1).strip()
                         destination = "Dubai"  # Always set to Dubai
                         
-                        # Search for flights with group size parameters
-                        flight_results = self.flights_finder_func({
+                        # Flight search with group size parameters
+                        flight_query = {
                             "departure_location": departure,
                             "destination": destination,
                             "outbound_date": outbound_date,
@@ -485,10 +486,10 @@ class Agent:
                             "include_airlines": "EK",  # Prefer Emirates Airlines
                             "adults": str(adults),
                             "children": str(children)
-                        })
+                        }
                         
-                        # Search for Dubai hotels with group size parameters
-                        hotel_results = self.hotels_finder_func({
+                        # Dubai hotel search with group size parameters
+                        hotel_query = {
                             "location": "Dubai",
                             "check_in_date": outbound_date,
                             "check_out_date": return_date,
@@ -496,7 +497,14 @@ class Agent:
                             "children": str(children),
                             "children_ages": children_ages if children > 0 else None,
                             "hotel_class": "5"  # Dubai luxury hotels
-                        })
+                        }
+                        
+                        # Run both lookups at once so the node costs the slower call, not the sum.
+                        # Each side degrades to an error payload on its own, keeping partial results.
+                        flight_results, hotel_results = await asyncio.gather(
+                            self._run_search("Flight", self.flights_finder_func, flight_query),
+                            self._run_search("Hotel", self.hotels_finder_func, hotel_query)
+                        )
                         
                         # Add results to messages
                         messages.extend([
@@ -516,117 +524,90 @@ class Agent:
             logging.error(f"Error in search_travel: {str(e)}")
             return {"messages": state["messages"]}
 
-    def create_itinerary(self, state: AgentState) -> AgentState:
-        """Create final Dubai itinerary"""
+    async def _run_search(self, label: str, finder, query: dict, timeout: float = SEARCH_TIMEOUT_SECONDS) -> str:
+        """Run a blocking finder on the search pool with a timeout, returning an error payload on failure"""
+        try:
+            loop = asyncio.get_running_loop()
+            key = (label, make_cache_key(query))
+            return await asyncio.wait_for(
+                search_flights.do(key, lambda: loop.run_in_executor(search_executor, finder, query)),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            logging.error(f"{label} search timed out after {timeout}s")
+            return json.dumps({"error": f"{label} search timed out after {timeout}s"})
+        except Exception as e:
+            logging.error(f"{label} search error: {str(e)}")
+            return json.dumps({"error": str(e)})
+
+    async def create_itinerary(self, state: AgentState) -> AgentState:
+        """Create the Dubai itinerary in a single generation grounded in the search results"""
         try:
             messages = state.get("messages", [])
             
-            # Create a Dubai-specific prompt for the final itinerary
-            prompt = SystemMessage(content="""Based on the flight and hotel data provided, create a detailed Dubai itinerary.
-            Focus on:
-            1. Popular Dubai attractions (Burj Khalifa, Dubai Mall, Palm Jumeirah, etc.)
-            2. Local cultural experiences (Gold Souk, Al Fahidi, etc.)
-            3. Modern entertainment (Dubai Frame, Museum of the Future, etc.)
-            4. Luxury experiences (Desert safaris, yacht tours, etc.)
-            
-            Format the response as valid JSON only:
-            {
-                "budget_analysis": {
-                    "total_budget": float,
-                    "flight_cost": float,
-                    "hotel_cost": float,
-                    "remaining_budget": float
-                },
-                "daily_itinerary": [
-                    {
-                        "day": int,
-                        "activities": [
-                            {
-                                "time": "HH:MM AM/PM",
-                                "title": string,
-                                "description": string,
-                                "location": string,
-                                "area": string,
-                                "price": float,
-                                "tip": string,
-                                "category": string
-                            }
-                        ]
-                    }
-                ]
-            }
-            
-            Important:
-            1. Include practical tips about dress code, customs, and weather
-            2. Consider prayer times and Ramadan if applicable
-            3. Account for Dubai's climate in activity planning
-            4. Include transportation recommendations
-            5. Suggest dining options for each day
-            """)
-            
             try:
                 # Get response from OpenAI
-                response = self.llm.invoke(messages + [prompt])
+                response = await self.llm.ainvoke(messages + [SystemMessage(content=ITINERARY_PROMPT)])
+                
+                itinerary_json = self._parse_itinerary(response.content)
+                return {"messages": messages + [AIMessage(content=json.dumps(itinerary_json, ensure_ascii=False))]}
                 
-                # Try to parse the response as JSON
-                try:
-                    content = response.content
-                    # Clean up the response if needed
-                    json_match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
-                    if json_match:
-                        content = json_match.group(1)
-                    
-                    content = re.sub(r'^[^{]*', '', content)
-                    content = re.sub(r'[^}]*$', '', content)
-                    
-                    # Parse and validate the JSON
-                    itinerary_json = json.loads(content)
-                    
-                    if not all(key in itinerary_json for key in ["budget_analysis", "daily_itinerary"]):
-                        raise ValueError("Missing required top-level keys")
-                    
-                    return {"messages": messages + [AIMessage(content=json.dumps(itinerary_json, ensure_ascii=False))]}
-                    
-                except json.JSONDecodeError as e:
-                    logging.error(f"Error parsing itinerary JSON: {e}")
-                    logging.error(f"Problematic content: {content}")
-                    raise
-                    
             except Exception as e:
                 logging.error(f"Error in create_itinerary: {e}")
                 raise
                 
         except Exception as e:
             logging.error(f"Error in create_itinerary: {str(e)}")
-            
-            # Return a fallback JSON response
-            fallback_json = {
-                "budget_analysis": {
-                    "total_budget": 0.0,
-                    "flight_cost": 0.0,
-                    "hotel_cost": 0.0,
-                    "remaining_budget": 0.0
-                },
-                "daily_itinerary": [
-                    {
-                        "day": 1,
-                        "activities": [
-                            {
-                                "time": "09:00 AM",
-                                "title": "Start of Day",
-                                "description": "We're preparing your Dubai itinerary",
-                                "location": "Dubai International Airport",
-                                "area": "Airport Area",
-                                "price": 0.0,
-                                "tip": "Please try again to get a complete Dubai itinerary",
-                                "category": "Transport"
-                            }
-                        ]
-                    }
-                ]
-            }
-            
-            return {"messages": state["messages"] + [AIMessage(content=json.dumps(fallback_json, ensure_ascii=False))]}
+            return {"messages": state["messages"] + [AIMessage(content=json.dumps(self._fallback_itinerary(), ensure_ascii=False))]}
+
+    def _parse_itinerary(self, content: str, parser: Optional[ArrayItemParser] = None) -> Dict[str, Any]:
+        """Extract and validate the itinerary JSON from raw model output, salvaging complete days if it was cut short"""
+        # A streaming caller passes the parser that already consumed the output
+        if parser is None:
+            parser = ArrayItemParser(["daily_itinerary"])
+            parser.feed(content)
+
+        itinerary_json, complete = extract_validated_object(parser, ITINERARY_SCHEMA)
+        if complete:
+            return itinerary_json
+
+        if not itinerary_json.get("daily_itinerary"):
+            logging.error(f"Problematic content: {content}")
+            raise ValueError("No complete itinerary days in model output")
+
+        logging.warning(
+            f"Itinerary output was incomplete or invalid, salvaged {len(itinerary_json['daily_itinerary'])} days"
+        )
+        itinerary_json.setdefault("budget_analysis", self._fallback_itinerary()["budget_analysis"])
+        return itinerary_json
+
+    def _fallback_itinerary(self) -> Dict[str, Any]:
+        """Placeholder itinerary returned when generation fails"""
+        return {
+            "budget_analysis": {
+                "total_budget": 0.0,
+                "flight_cost": 0.0,
+                "hotel_cost": 0.0,
+                "remaining_budget": 0.0
+            },
+            "daily_itinerary": [
+                {
+                    "day": 1,
+                    "activities": [
+                        {
+                            "time": "09:00 AM",
+                            "title": "Start of Day",
+                            "description": "We're preparing your Dubai itinerary",
+                            "location": "Dubai International Airport",
+                            "area": "Airport Area",
+                            "price": 0.0,
+                            "tip": "Please try again to get a complete Dubai itinerary",
+                            "category": "Transport"
+                        }
+                    ]
+                }
+            ]
+        }
 
     def _extract_departure(self, content: str) -> str:
         """Extract departure location from message content"""
@@ -645,6 +626,13 @@ class Agent:
 
     async def plan_travel(self, request: TravelRequest) -> Dict[str, Any]:
         """Main method to handle travel planning requests"""
+        if COALESCE_PLAN_REQUESTS:
+            key = json.dumps(request.model_dump(), sort_keys=True)
+            return await plan_flights.do(key, lambda: self._run_plan(request))
+        return await self._run_plan(request)
+
+    async def _run_plan(self, request: TravelRequest) -> Dict[str, Any]:
+        """Run the planning graph for a single request"""
         try:
             # Format the input message
             input_message = self._format_travel_request(request)
@@ -666,6 +654,42 @@ class Agent:
             logging.error(f"Error in plan_travel: {str(e)}")
             raise
 
+    async def stream_plan(self, request: TravelRequest):
+        """Yield plan events as they become available: flights and hotels first, then each itinerary day"""
+        state = await self.search_travel({
+            "messages": [HumanMessage(content=self._format_travel_request(request))]
+        })
+        messages = state["messages"]
+        
+        flights, hotels = self._extract_search_results(messages)
+        yield {"type": "flights", "flights": flights}
+        yield {"type": "hotels", "hotels": hotels}
+        
+        # Decode each daily_itinerary entry as soon as the model closes it
+        parser = ArrayItemParser(["daily_itinerary"])
+        days_sent = 0
+        try:
+            async for chunk in self.llm.astream(messages + [SystemMessage(content=ITINERARY_PROMPT)]):
+                for day in parser.feed(chunk.content):
+                    # Same check the final parse applies, so every day sent here is also kept there
+                    day, errors = conform_to_schema(day, DAY_SCHEMA)
+                    if errors:
+                        logging.error(f"Skipping malformed itinerary day: {'; '.join(errors)}")
+                        continue
+                    formatted_day = self._format_day(day)
+                    days_sent += 1
+                    yield {"type": "day", "day": formatted_day}
+            
+            itinerary_json = self._parse_itinerary(parser.text, parser)
+        except Exception as e:
+            logging.error(f"Error streaming itinerary: {str(e)}")
+            itinerary_json = self._fallback_itinerary()
+            if days_sent == 0:
+                for day in itinerary_json["daily_itinerary"]:
+                    yield {"type": "day", "day": self._format_day(day)}
+        
+        yield {"type": "done", "budget_analysis": itinerary_json.get("budget_analysis", {})}
+
     def _format_travel_request(self, request: TravelRequest) -> str:
         """Format the travel request into a structured message"""
         departure = request.departureLocation or "Unknown"
@@ -682,30 +706,7 @@ class Agent:
         """Process the final result from the graph into structured data"""
         try:
             messages = result.get("messages", [])
-            
-            # Parse flights from messages
-            flights = []
-            flight_message = next((msg for msg in messages 
-                if isinstance(msg, AIMessage) and "Flight Options:" in msg.content), None)
-            if flight_message:
-                try:
-                    flight_json = flight_message.content.split('Flight Options:\n')[1]
-                    flight_data = json.loads(flight_json)
-                    flights = flight_data.get('flights', [])
-                except Exception as e:
-                    logging.error(f"Error parsing flights: {e}")
-
-            # Parse hotels from messages
-            hotels = []
-            hotel_message = next((msg for msg in messages 
-                if isinstance(msg, AIMessage) and "Hotel Recommendations:" in msg.content), None)
-            if hotel_message:
-                try:
-                    hotel_json = hotel_message.content.split('Hotel Recommendations:\n')[1]
-                    hotel_data = json.loads(hotel_json)
-                    hotels = hotel_data.get('hotels', [])
-                except Exception as e:
-                    logging.error(f"Error parsing hotels: {e}")
+            flights, hotels = self._extract_search_results(messages)
 
             # Get the itinerary from the assistant's JSON response
             itinerary_message = next((msg for msg in messages 
@@ -719,21 +720,7 @@ class Agent:
                     # Format the itinerary from the JSON structure
                     itinerary = []
                     if "daily_itinerary" in content:
-                        itinerary = [{
-                            "day": day["day"],
-                            "activities": [{
-                                "id": f"{day['day']}-{i}",
-                                "day": day["day"],
-                                "time": activity["time"],
-                                "title": activity["title"],
-                                "description": activity["description"],
-                                "location": activity["location"],
-                                "area": activity.get("area", self.get_dubai_area(activity["location"])),
-                                "type": activity.get("category", self._determine_activity_type(activity["title"])),
-                                "price": float(activity["price"]),
-                                "tips": [activity.get("tip", "")]
-                            } for i, activity in enumerate(day["activities"])]
-                        } for day in content["daily_itinerary"]]
+                        itinerary = [self._format_day(day) for day in content["daily_itinerary"]]
                     
                     logging.info(f"Processed itinerary: {json.dumps(itinerary, indent=2)}")
                     
@@ -770,6 +757,50 @@ class Agent:
                 "messages": []
             }
 
+    def _extract_search_results(self, messages: List[BaseMessage]) -> tuple:
+        """Parse the flight and hotel lists out of the search_travel messages"""
+        flights = []
+        flight_message = next((msg for msg in messages 
+            if isinstance(msg, AIMessage) and "Flight Options:" in msg.content), None)
+        if flight_message:
+            try:
+                flight_json = flight_message.content.split('Flight Options:\n')[1]
+                flight_data = json.loads(flight_json)
+                flights = flight_data.get('flights', [])
+            except Exception as e:
+                logging.error(f"Error parsing flights: {e}")
+
+        hotels = []
+        hotel_message = next((msg for msg in messages 
+            if isinstance(msg, AIMessage) and "Hotel Recommendations:" in msg.content), None)
+        if hotel_message:
+            try:
+                hotel_json = hotel_message.content.split('Hotel Recommendations:\n')[1]
+                hotel_data = json.loads(hotel_json)
+                hotels = hotel_data.get('hotels', [])
+            except Exception as e:
+                logging.error(f"Error parsing hotels: {e}")
+
+        return flights, hotels
+
+    def _format_day(self, day: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert one generated daily_itinerary entry into the response format"""
+        return {
+            "day": day["day"],
+            "activities": [{
+                "id": f"{day['day']}-{i}",
+                "day": day["day"],
+                "time": activity["time"],
+                "title": activity["title"],
+                "description": activity["description"],
+                "location": activity["location"],
+                "area": activity.get("area", self.get_dubai_area(activity["location"])),
+                "type": activity.get("category", self._determine_activity_type(activity["title"])),
+                "price": float(activity["price"]),
+                "tips": [activity.get("tip", "")]
+            } for i, activity in enumerate(day["activities"])]
+        }
+
     def _extract_location(self, description: str) -> str:
         """Extract location from activity description"""
         # Look for common location indicators
@@ -788,20 +819,7 @@ class Agent:
 
     def _determine_activity_type(self, description: str) -> str:
         """Determine activity type based on description"""
-        type_keywords = {
-            'meal': ['breakfast', 'lunch', 'dinner', 'restaurant', 'dining'],
-            'sightseeing': ['visit', 'explore', 'tour', 'see'],
-            'shopping': ['shop', 'market', 'store'],
-            'transport': ['depart', 'arrive', 'check-in', 'check-out'],
-            'cultural': ['temple', 'shrine', 'museum', 'ceremony'],
-            'nature': ['park', 'garden', 'mountain', 'forest']
-        }
-        
-        description_lower = description.lower()
-        for activity_type, keywords in type_keywords.items():
-            if any(keyword in description_lower for keyword in keywords):
-                return activity_type
-        return 'activity'
+        return activity_type_matcher.match(description)
 
     def _validate_date_format(self, date_str: str) -> bool:
         """Validate that a date string is in YYYY-MM-DD format"""
@@ -853,37 +871,7 @@ class Agent:
 
     def get_dubai_area(self, location: str) -> str:
         """Map location to Dubai area/district"""
-        dubai_areas = {
-            "burj khalifa": "Downtown Dubai",
-            "dubai mall": "Downtown Dubai",
-            "palm jumeirah": "Palm Jumeirah",
-            "burj al arab": "Jumeirah",
-            "gold souk": "Deira",
-            "dubai marina": "Dubai Marina",
-            "dubai frame": "Zabeel",
-            "dubai creek": "Deira",
-            "jumeirah beach": "Jumeirah",
-            "mall of emirates": "Al Barsha",
-            "dubai miracle garden": "Al Barsha South",
-            "global village": "Dubailand",
-            "dubai opera": "Downtown Dubai",
-            "city walk": "Al Wasl",
-            "la mer": "Jumeirah",
-            "dubai water canal": "Business Bay",
-            "dubai design district": "Business Bay",
-            "dubai international airport": "Airport Area",
-            "ibn battuta mall": "Jebel Ali",
-            "dubai festival city": "Festival City"
-        }
-        
-        if not location:
-            return "Dubai"
-            
-        location_lower = location.lower()
-        for key, area in dubai_areas.items():
-            if key in location_lower:
-                return area
-        return "Dubai"
+        return dubai_area_matcher.match(location)
 
     def format_itinerary_for_context(self, itinerary: list) -> str:
         try:
@@ -947,17 +935,52 @@ class Agent:
 
     def clean_markdown_formatting(self, text: str) -> str:
         """Remove markdown formatting from text."""
-        # Remove bold formatting
-        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-        # Remove italic formatting
-        text = re.sub(r'\*(.*?)\*', r'\1', text)
-        # Remove bullet points
-        text = re.sub(r'^\s*[-•]\s*', '', text, flags=re.MULTILINE)
-        return text
+        return clean_markdown(text)
 
 # Initialize the agent
 agent = Agent()
 
+# Schema setup and the writer connection happen once here rather than on every request
+etl = ETLProcessor()
+
+# Interactions are acknowledged on enqueue and committed in batches, keeping fsync off the request path
+ingestion_queue = IngestionQueue(
+    etl,
+    max_batch_size=int(os.getenv("INGEST_MAX_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("INGEST_FLUSH_INTERVAL_SECONDS", "0.25")),
+    max_queue_size=int(os.getenv("INGEST_MAX_QUEUE_SIZE", "10000")),
+    enqueue_timeout=float(os.getenv("INGEST_ENQUEUE_TIMEOUT_SECONDS", "2"))
+)
+
+INTERACTION_EXPORT_INTERVAL_SECONDS = float(os.getenv("INTERACTION_EXPORT_INTERVAL_SECONDS", "86400"))
+
+async def run_interaction_maintenance():
+    """Backfill rows from before the typed-column migration, then export closed months to Parquet periodically"""
+    await asyncio.to_thread(etl.backfill_typed_columns)
+    while True:
+        try:
+            await asyncio.to_thread(etl.export_closed_months)
+        except Exception as e:
+            logging.error(f"Error exporting interactions to Parquet: {str(e)}")
+        await asyncio.sleep(INTERACTION_EXPORT_INTERVAL_SECONDS)
+
+@app.on_event("startup")
+async def startup():
+    await ingestion_queue.start()
+    # Maintenance runs in the background so it never delays startup
+    app.state.maintenance_task = asyncio.create_task(run_interaction_maintenance())
+    if search_cache.disk is not None:
+        search_cache.disk.start_compaction()
+
+@app.on_event("shutdown")
+async def shutdown():
+    if search_cache.disk is not None:
+        search_cache.disk.stop_compaction()
+    await llm_registry.aclose()
+    app.state.maintenance_task.cancel()
+    await ingestion_queue.stop()
+    etl.close()
+
 @app.post("/api/travel/plan")
 async def plan_travel(request: TravelRequest) -> Dict[str, Any]:
     logging.info(f"Received travel plan request: {request}") 
@@ -982,64 +1005,80 @@ async def plan_travel(request: TravelRequest) -> Dict[str, Any]:
             "messages": [{"role": "assistant", "content": "Error generating travel plan"}]
         } 
 
+@app.post("/api/travel/plan/stream")
+async def plan_travel_stream(request: TravelRequest):
+    """NDJSON variant of /api/travel/plan that sends flights, hotels and each day as they are ready"""
+    logging.info(f"Received streaming travel plan request: {request}")
+
+    async def events():
+        try:
+            async for event in agent.stream_plan(request):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logging.error(f"Error in plan_travel_stream endpoint: {str(e)}")
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+def build_chat_messages(request: dict) -> List[BaseMessage]:
+    """Build the Dubai assistant prompt for a chat request"""
+    message = request.get("message")
+    context = request.get("context", {})
+    
+    # Format weather information
+    weather_info = ""
+    if context.get('weather'):
+        weather_info = "Weather during your stay:\n"
+        for day in context.get('weather', []):
+            date = day.get('date', '')
+            temp = day.get('temperature', '')
+            humidity = day.get('humidity', '')
+            weather_info += f"- {date}: {temp}°C, {humidity}% humidity\n"
+    
+    # Create a Dubai-specific system message using agent methods
+    system_message = f"""You are Sayih, a friendly and knowledgeable Dubai tourism assistant. You have extensive expertise about Dubai's attractions, culture, and practical travel information. You represent the Dubai Department of Economy and Tourism.
+
+    Current Trip Context:
+    - Travel Dates: {context.get('dateRange', {})}
+    - Group Size: {context.get('groupSize', '')}
+    - Budget: ${context.get('budget', 0)} per day
+    - Interests: {context.get('interests', '')}
+    
+    {weather_info}
+    
+    Planned Itinerary:
+    {agent.format_itinerary_for_context(context.get('itinerary', []))}
+    
+    Selected Flights:
+    {agent.format_flights_for_context(context.get('flights', []))}
+    
+    Hotel Options:
+    {agent.format_hotels_for_context(context.get('hotels', []))}
+
+    Guidelines:
+    1. Always maintain a warm, professional tone
+    2. Provide accurate information about Dubai's attractions and customs
+    3. Share cultural insights and local etiquette tips
+    4. Recommend activities based on weather and seasonal events
+    5. Include practical tips about transportation, dress code, and local customs
+    6. Reference specific Dubai locations and landmarks
+    7. Mention relevant Dubai initiatives and tourism programs when appropriate
+    8. Provide information about current events and festivals when relevant
+    """
+    
+    return [
+        SystemMessage(content=system_message),
+        HumanMessage(content=message)
+    ]
+
 @app.post("/api/chat")
 async def chat(request: dict):
     try:
-        message = request.get("message")
-        context = request.get("context", {})
-        
-        # Format weather information
-        weather_info = ""
-        if context.get('weather'):
-            weather_info = "Weather during your stay:\n"
-            for day in context.get('weather', []):
-                date = day.get('date', '')
-                temp = day.get('temperature', '')
-                humidity = day.get('humidity', '')
-                weather_info += f"- {date}: {temp}°C, {humidity}% humidity\n"
-        
-        # Create a Dubai-specific system message using agent methods
-        system_message = f"""You are Sayih, a friendly and knowledgeable Dubai tourism assistant. You have extensive expertise about Dubai's attractions, culture, and practical travel information. You represent the Dubai Department of Economy and Tourism.
-
-        Current Trip Context:
-        - Travel Dates: {context.get('dateRange', {})}
-        - Group Size: {context.get('groupSize', '')}
-        - Budget: ${context.get('budget', 0)} per day
-        - Interests: {context.get('interests', '')}
-        
-        {weather_info}
-        
-        Planned Itinerary:
-        {agent.format_itinerary_for_context(context.get('itinerary', []))}
-        
-        Selected Flights:
-        {agent.format_flights_for_context(context.get('flights', []))}
-        
-        Hotel Options:
-        {agent.format_hotels_for_context(context.get('hotels', []))}
-
-        Guidelines:
-        1. Always maintain a warm, professional tone
-        2. Provide accurate information about Dubai's attractions and customs
-        3. Share cultural insights and local etiquette tips
-        4. Recommend activities based on weather and seasonal events
-        5. Include practical tips about transportation, dress code, and local customs
-        6. Reference specific Dubai locations and landmarks
-        7. Mention relevant Dubai initiatives and tourism programs when appropriate
-        8. Provide information about current events and festivals when relevant
-        """
-        
-        # Create chat completion using OpenAI
-        chat = ChatOpenAI(
-            temperature=0.7,
-            model="gpt-4o"
-        )
+        # Create chat completion using the shared OpenAI client
+        chat = llm_registry.get_chat_model(model="gpt-4o", temperature=0.7)
         
         # Get response from OpenAI
-        response = chat.invoke([
-            SystemMessage(content=system_message),
-            HumanMessage(content=message)
-        ])
+        response = await chat.ainvoke(build_chat_messages(request))
         
         # Clean the response before sending
         cleaned_response = agent.clean_markdown_formatting(response.content)
@@ -1057,11 +1096,56 @@ async def chat(request: dict):
             "status": "error"
         } 
 
+@app.post("/api/chat/stream")
+async def chat_stream(request: dict):
+    """NDJSON variant of /api/chat that sends cleaned tokens as they arrive"""
+    messages = build_chat_messages(request)
+    chat = llm_registry.get_chat_model(model="gpt-4o", temperature=0.7)
+
+    async def events():
+        cleaner = MarkdownStreamCleaner()
+        try:
+            async for chunk in chat.astream(messages):
+                text = cleaner.feed(chunk.content)
+                if text:
+                    yield json.dumps({"type": "token", "content": text}, ensure_ascii=False) + "\n"
+
+            text = cleaner.flush()
+            if text:
+                yield json.dumps({"type": "token", "content": text}, ensure_ascii=False) + "\n"
+            yield json.dumps({"type": "done", "status": "success"}) + "\n"
+
+        except Exception as e:
+            logging.error(f"Error in chat stream endpoint: {str(e)}")
+            yield json.dumps({
+                "type": "error",
+                "error": str(e),
+                "message": "I apologize, but I encountered an error. Please try again.",
+                "status": "error"
+            }) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.get("/api/metrics")
+async def metrics():
+    return {
+        "search_cache": search_cache.stats(),
+        "single_flight": {
+            "search": search_flights.stats(),
+            "plan": plan_flights.stats()
+        },
+        "llm_pool": llm_registry.stats(),
+        "airport_codes": airport_resolver.stats(),
+        "etl": etl.stats(),
+        "ingestion": ingestion_queue.stats()
+    }
+
 @app.post("/store_interaction")
 async def store_interaction(data: dict):
     try:
-        etl = ETLProcessor()
-        etl.store_interaction(data)
+        await ingestion_queue.put(data)
         return {"status": "success"}
+    except IngestionQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""Dashboard load time and peak memory for the "Current Quarter" period on a large interactions database.
+
+Compares the original load (SELECT * and per-row JSON/strptime parsing in pandas, then filtering),
+the SQL range query on the typed, indexed travel columns, and the rollup read the dashboard does
+now. Peak memory is the tracemalloc peak, which covers pandas/numpy buffers. Run from backend/:
+
+    python benchmarks/bench_dashboard_load.py --rows 1000000 --db /tmp/bench_interactions.db
+
+An existing --db with at least --rows interactions is reused.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from dashboard_data import RECORD_COLUMNS, PeriodCache
+from etl_processor import ETLProcessor
+
+CITIES = ["London", "Paris", "Mumbai", "New York", "Riyadh", "Cairo", "Moscow", "Beijing", "Sydney", "Berlin"]
+GROUPS = ["solo", "couple", "family", "group"]
+
+
+def current_quarter(today: date):
+    start = date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+    end = (date(start.year + (start.month + 2) // 12, (start.month + 2) % 12 + 1, 1)) - timedelta(days=1)
+    return start, end
+
+
+def build_database(db_path: str, rows: int):
+    ETLProcessor(db_path).close()
+    rng = random.Random(42)
+    today = date.today()
+    conn = sqlite3.connect(db_path)
+    batch = []
+    for number in range(rows):
+        # Trips spread over two years around today, booked up to 90 days ahead
+        travel_start = today + timedelta(days=rng.randint(-365, 365))
+        travel_end = travel_start + timedelta(days=rng.randint(2, 14))
+        booked = datetime.combine(travel_start - timedelta(days=rng.randint(1, 90)), datetime.min.time())
+        group = rng.choice(GROUPS)
+        budget = rng.randint(1000, 20000)
+        batch.append((
+            f"int_{number:08d}", booked, rng.choice(CITIES),
+            json.dumps({"from": travel_start.isoformat(), "to": travel_end.isoformat()}),
+            (travel_end - travel_start).days + 1, group, str(budget), "culture, food", True,
+            travel_start.isoformat(), travel_end.isoformat(), group, float(budget)
+        ))
+        if len(batch) == 50_000:
+            insert(conn, batch)
+            batch = []
+    insert(conn, batch)
+    conn.close()
+    processor = ETLProcessor(db_path)
+    processor.refresh_rollups()
+    processor.close()
+
+
+def insert(conn, batch):
+    with conn:
+        conn.executemany('''
+            INSERT INTO user_interactions (
+                interaction_id, timestamp, departure_location, travel_dates, duration_days, group_size, budget,
+                interests, generated_itinerary, travel_start, travel_end, group_type, budget_amount
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', batch)
+
+
+def load_everything_then_filter(db_path: str, start: date, end: date) -> int:
+    # The original load_data, minus its st.write debug output
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql_query('SELECT * FROM user_interactions', conn)
+    conn.close()
+    df['travel_dates'] = df['travel_dates'].apply(lambda x: json.loads(x) if isinstance(x, str) else x)
+    df['travel_start'] = df['travel_dates'].apply(lambda x: datetime.strptime(x['from'], '%Y-%m-%d').date())
+    df['travel_end'] = df['travel_dates'].apply(lambda x: datetime.strptime(x['to'], '%Y-%m-%d').date())
+    df = df[(df['travel_start'] >= start) & (df['travel_end'] <= end)]
+    return len(df)
+
+
+def load_period_range(db_path: str, start: date, end: date) -> int:
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql_query(
+        f"SELECT {', '.join(RECORD_COLUMNS)} FROM user_interactions WHERE travel_start >= ? AND travel_end <= ?",
+        conn, params=(start.isoformat(), end.isoformat())
+    )
+    conn.close()
+    df['travel_start'] = pd.to_datetime(df['travel_start'], format='%Y-%m-%d')
+    df['travel_end'] = pd.to_datetime(df['travel_end'], format='%Y-%m-%d')
+    return len(df)
+
+
+def load_period_rollups(db_path: str, start: date, end: date) -> int:
+    frames = PeriodCache(db_path).load(start.isoformat(), end.isoformat())
+    return int(frames['origins']['visitors'].sum())
+
+
+def measure(label: str, load, db_path: str, start: date, end: date):
+    tracemalloc.start()
+    started = time.perf_counter()
+    interactions = load(db_path, start, end)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed:>9.2f} {peak / 2 ** 20:>13.1f} {interactions:>14,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--db", help="database to build or reuse; a temporary one by default")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        db_path = args.db or os.path.join(data_dir, "user_interactions.db")
+        existing = 0
+        if os.path.exists(db_path):
+            with sqlite3.connect(db_path) as conn:
+                existing = conn.execute("SELECT COUNT(*) FROM user_interactions").fetchone()[0]
+        if existing < args.rows:
+            started = time.perf_counter()
+            build_database(db_path, args.rows)
+            print(f"Built {args.rows:,} interactions in {time.perf_counter() - started:.1f}s")
+
+        start, end = current_quarter(date.today())
+        print(f"Current Quarter: {start} to {end}")
+        print(f"{'load':<28} {'seconds':>9} {'peak MiB':>13} {'interactions':>14}")
+        measure("SELECT * + pandas filter", load_everything_then_filter, db_path, start, end)
+        measure("SQL range on typed columns", load_period_range, db_path, start, end)
+        measure("rollup tables", load_period_rollups, db_path, start, end)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Row-wise vs vectorized date parsing and month labelling for the dashboard's booking records.
+
+Times the per-row path the dashboard used (json.loads + strptime applies, format-inferring
+to_datetime, strftime month labels, date strings parsed back, month-name sort keys) against the
+column-wise one (explicit-format to_datetime, categorical month names, normalize). Run from backend/:
+
+    python benchmarks/bench_date_parsing.py --rows 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from dashboard_data import month_name_categories
+
+
+def make_records(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    travel_start = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 730, rows), unit="D")
+    travel_end = travel_start + pd.to_timedelta(rng.integers(2, 14, rows), unit="D")
+    booked = travel_start - pd.to_timedelta(rng.integers(86_400, 90 * 86_400, rows), unit="s")
+    starts = travel_start.strftime("%Y-%m-%d")
+    ends = travel_end.strftime("%Y-%m-%d")
+    return pd.DataFrame({
+        # As SQLite hands them back: text columns
+        "timestamp": booked.strftime("%Y-%m-%d %H:%M:%S.%f"),
+        "travel_dates": [json.dumps({"from": start, "to": end}) for start, end in zip(starts, ends)],
+        "travel_start": starts,
+        "travel_end": ends,
+        "duration_days": rng.integers(3, 15, rows)
+    })
+
+
+def row_wise(df: pd.DataFrame):
+    travel_dates = df["travel_dates"].apply(json.loads)
+    travel_start = travel_dates.apply(lambda x: datetime.strptime(x["from"], "%Y-%m-%d").date())
+    travel_dates.apply(lambda x: datetime.strptime(x["to"], "%Y-%m-%d").date())
+    timestamp = pd.to_datetime(df["timestamp"], errors="coerce")
+    month_name = timestamp.dt.strftime("%B")
+    day = pd.to_datetime(timestamp.dt.strftime("%Y-%m-%d"))
+    monthly = pd.DataFrame({"year": timestamp.dt.year, "month_name": month_name}).groupby(
+        ["year", "month_name"]).size()
+    daily = day.value_counts()
+    seasonal = pd.DataFrame({
+        "month": pd.to_datetime(pd.Series(travel_start)).dt.strftime("%B"),
+        "duration_days": df["duration_days"]
+    }).groupby("month")["duration_days"].agg(["mean", "count"]).reset_index()
+    seasonal = seasonal.sort_values("month", key=lambda x: pd.to_datetime(x, format="%B"))
+    return len(monthly), len(daily), len(seasonal)
+
+
+def vectorized(df: pd.DataFrame):
+    timestamp = pd.to_datetime(df["timestamp"], format="ISO8601", errors="coerce")
+    travel_start = pd.to_datetime(df["travel_start"], format="%Y-%m-%d", errors="coerce")
+    pd.to_datetime(df["travel_end"], format="%Y-%m-%d", errors="coerce")
+    month_name = month_name_categories(timestamp.dt.month)
+    day = timestamp.dt.normalize()
+    monthly = pd.DataFrame({"year": timestamp.dt.year, "month_name": month_name}).groupby(
+        ["year", "month_name"], observed=True).size()
+    daily = day.value_counts()
+    seasonal = pd.DataFrame({
+        "month": month_name_categories(travel_start.dt.month),
+        "duration_days": df["duration_days"]
+    }).groupby("month", observed=True)["duration_days"].agg(["mean", "count"]).reset_index()
+    return len(monthly), len(daily), len(seasonal)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = make_records(args.rows)
+    timings = {}
+    for label, parse in (("row-wise", row_wise), ("vectorized", vectorized)):
+        started = time.perf_counter()
+        buckets = parse(df)
+        timings[label] = time.perf_counter() - started
+        print(f"{label:<12} {timings[label]:>8.2f}s  (monthly, daily, seasonal buckets: {buckets})")
+    print(f"speedup      {timings['row-wise'] / timings['vectorized']:>8.1f}x on {args.rows:,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Activity tagging throughput: the precompiled gazetteer against the original linear phrase scan.
+
+Matches the same random activity strings with agent.py's area and activity-type tables, then with
+synthetic tables of growing size, checking both paths return identical results. The linear scan is
+the original loop: lower() the text, then `if phrase in text` over every phrase in order. Run from
+backend/:
+
+    python benchmarks/bench_gazetteer.py --strings 10000 --phrases 1000 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# agent.py opens its SQLite files at import time; keep them away from backend/data
+os.environ["ETL_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench-gazetteer-"), "user_interactions.db")
+os.environ["SEARCH_CACHE_DISK_ENABLED"] = "false"
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from agent import ACTIVITY_TYPE_KEYWORDS, DUBAI_AREAS
+from gazetteer import Gazetteer
+
+FILLER = ["morning", "afternoon", "evening", "walk", "to", "the", "and", "enjoy", "views", "at", "near", "with"]
+
+
+def linear_scan(entries, default):
+    def match(text):
+        if not text:
+            return default
+        text = text.lower()
+        for phrase, value in entries:
+            if phrase in text:
+                return value
+        return default
+    return match
+
+
+def synthetic_entries(count: int, rng: random.Random):
+    syllables = ["al", "bur", "da", "er", "ja", "ka", "lu", "ma", "na", "qa", "ra", "sa", "ta", "wa", "za"]
+    entries = {}
+    while len(entries) < count:
+        words = ["".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(rng.randint(1, 3))]
+        entries.setdefault(" ".join(words), f"Area {len(entries) % 50}")
+    return list(entries.items())
+
+
+def make_strings(entries, count: int, rng: random.Random):
+    # About half the strings mention a known phrase, in random case
+    strings = []
+    for _ in range(count):
+        words = rng.choices(FILLER, k=rng.randint(4, 12))
+        if rng.random() < 0.5:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(entries)[0])
+        text = " ".join(words)
+        strings.append(text.upper() if rng.random() < 0.2 else text.title() if rng.random() < 0.3 else text)
+    return strings
+
+
+def measure(label: str, entries, default, strings):
+    started = time.perf_counter()
+    gazetteer = Gazetteer(entries, default)
+    compile_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matched = [gazetteer.match(text) for text in strings]
+    gazetteer_seconds = time.perf_counter() - started
+
+    scan = linear_scan(entries, default)
+    started = time.perf_counter()
+    expected = [scan(text) for text in strings]
+    scan_seconds = time.perf_counter() - started
+
+    assert matched == expected, f"{label}: gazetteer and linear scan disagree"
+    print(f"{label:<22} {len(entries):>8,} {compile_seconds * 1000:>11.1f} "
+          f"{scan_seconds:>10.3f} {gazetteer_seconds:>12.3f} {scan_seconds / gazetteer_seconds:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--strings", type=int, default=10_000)
+    parser.add_argument("--phrases", type=int, nargs="+", default=[1000, 5000])
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"Matching {args.strings:,} strings")
+    print(f"{'table':<22} {'phrases':>8} {'compile ms':>11} {'linear s':>10} {'gazetteer s':>12} {'speedup':>9}")
+    areas = list(DUBAI_AREAS.items())
+    measure("Dubai areas", areas, "Dubai", make_strings(areas, args.strings, rng))
+    activity_types = [(phrase, kind) for kind, phrases in ACTIVITY_TYPE_KEYWORDS.items() for phrase in phrases]
+    measure("activity types", activity_types, "activity", make_strings(activity_types, args.strings, rng))
+    for count in args.phrases:
+        entries = synthetic_entries(count, rng)
+        measure("synthetic", entries, "Dubai", make_strings(entries, args.strings, rng))
+
+
+if __name__ == "__main__":
+    main()
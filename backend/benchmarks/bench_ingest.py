@@ -0,0 +1,207 @@
+"""Interaction inserts/sec under concurrent load, for each way /store_interaction has written to SQLite.
+
+Each variant is served by uvicorn on a local port and hammered by concurrent httpx clients; the rate
+counts rows committed to a fresh database by the time every request has been answered (and, for the
+queue, flushed). The client and server share one process, so on a machine with few cores the HTTP
+stack can cap every variant at the same rate; the second table times the storage path alone, with
+the same concurrency in threads. Run from backend/:
+
+    python benchmarks/bench_ingest.py --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from etl_processor import ETLProcessor
+from ingestion import IngestionQueue
+
+INTERACTION = {
+    "departureLocation": "London",
+    "dateRange": json.dumps({"from": "2025-03-01", "to": "2025-03-05"}),
+    "groupSize": "couple",
+    "budget": "5000",
+    "interests": "culture, food",
+    "travelPlan": True
+}
+
+
+def store_per_request(db_path: str, data: dict, number: int):
+    # The original endpoint: a new processor per request, so a fresh connection and the CREATE TABLE
+    # DDL every time, in the default rollback-journal mode (the debug table dump is left out)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS user_interactions (
+                interaction_id TEXT PRIMARY KEY, timestamp DATETIME, departure_location TEXT, travel_dates TEXT,
+                duration_days INTEGER, group_size TEXT, budget TEXT, interests TEXT, generated_itinerary BOOLEAN
+            )
+        ''')
+        conn.execute("INSERT INTO user_interactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            f"int_{number}", datetime.now(), data.get("departureLocation"), data.get("dateRange"), 5,
+            data.get("groupSize"), data.get("budget"), data.get("interests"), bool(data.get("travelPlan"))
+        ))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def per_request_app(db_path: str) -> FastAPI:
+    app = FastAPI()
+    counter = iter(range(10 ** 9))
+
+    @app.post("/store_interaction")
+    async def store_interaction(data: dict):
+        store_per_request(db_path, data, next(counter))
+        return {"status": "success"}
+
+    return app
+
+
+def long_lived_writer_app(db_path: str) -> FastAPI:
+    app = FastAPI()
+    processor = ETLProcessor(db_path)
+    app.state.close = processor.close
+
+    @app.post("/store_interaction")
+    async def store_interaction(data: dict):
+        await asyncio.to_thread(processor.store_interaction, data)
+        return {"status": "success"}
+
+    return app
+
+
+def queued_app(db_path: str) -> FastAPI:
+    app = FastAPI()
+    processor = ETLProcessor(db_path)
+    queue = IngestionQueue(processor)
+
+    @app.on_event("startup")
+    async def startup():
+        await queue.start()
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        await queue.stop()
+        processor.close()
+
+    @app.post("/store_interaction")
+    async def store_interaction(data: dict):
+        await queue.put(data)
+        return {"status": "success"}
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def load(url: str, requests: int, concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        remaining = iter(range(requests))
+        failures = 0
+
+        async def worker():
+            nonlocal failures
+            for _ in remaining:
+                response = await client.post(url, json=INTERACTION)
+                failures += response.status_code != 200
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return failures
+
+
+def bench(label: str, make_app, requests: int, concurrency: int):
+    with tempfile.TemporaryDirectory() as data_dir:
+        db_path = os.path.join(data_dir, "user_interactions.db")
+        app = make_app(db_path)
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+
+        started = time.perf_counter()
+        failures = asyncio.run(load(f"http://127.0.0.1:{port}/store_interaction", requests, concurrency))
+        answered = time.perf_counter() - started
+        # Shutdown flushes whatever the queue still holds
+        server.should_exit = True
+        thread.join()
+        if hasattr(app.state, "close"):
+            app.state.close()
+        committed = time.perf_counter() - started
+
+        with sqlite3.connect(db_path) as conn:
+            rows = conn.execute("SELECT COUNT(*) FROM user_interactions").fetchone()[0]
+    print(f"{label:<18} {requests / answered:>12.0f} {rows / committed:>12.0f} {rows:>8} {failures:>9}")
+
+
+def bench_storage(label: str, store, requests: int, concurrency: int, db_path: str):
+    remaining = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                number = next(remaining, None)
+            if number is None:
+                return
+            store(number)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT COUNT(*) FROM user_interactions").fetchone()[0]
+    print(f"{label:<18} {rows / elapsed:>12.0f} {rows:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{args.requests} POST /store_interaction, concurrency {args.concurrency}")
+    print(f"{'variant':<18} {'answered/s':>12} {'inserts/s':>12} {'rows':>8} {'failures':>9}")
+    bench("per-request", per_request_app, args.requests, args.concurrency)
+    bench("long-lived writer", long_lived_writer_app, args.requests, args.concurrency)
+    bench("ingestion queue", queued_app, args.requests, args.concurrency)
+
+    print(f"\nStorage path only, {args.concurrency} threads")
+    print(f"{'variant':<18} {'inserts/s':>12} {'rows':>8}")
+    with tempfile.TemporaryDirectory() as data_dir:
+        db_path = os.path.join(data_dir, "per-request.db")
+        bench_storage("per-request", lambda number: store_per_request(db_path, INTERACTION, number),
+                      args.requests, args.concurrency, db_path)
+
+        processor = ETLProcessor(os.path.join(data_dir, "writer.db"))
+        bench_storage("long-lived writer", lambda number: processor.store_interaction(INTERACTION),
+                      args.requests, args.concurrency, processor.db_path)
+        processor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Per-request ChatOpenAI clients vs the shared LLMClientRegistry, against a local stub server.
+
+The stub answers every chat completion with a canned reply, so the timings are client overhead:
+building the client, TLS-free TCP connects, and keep-alive reuse. Run from backend/:
+
+    python benchmarks/bench_llm_pool.py --requests 200 --concurrency 10
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMPLETION = json.dumps({
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "Hello from Dubai"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 5, "completion_tokens": 4, "total_tokens": 9}
+}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    latency = 0.0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(COMPLETION)))
+        self.end_headers()
+        self.wfile.write(COMPLETION)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server(latency: float) -> ThreadingHTTPServer:
+    StubHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run(make_model, requests: int, concurrency: int):
+    from langchain_core.messages import HumanMessage
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await make_model().ainvoke([HumanMessage(content="Plan a day in Dubai")])
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, time.perf_counter() - started
+
+
+def report(label: str, latencies, elapsed: float, connections: int):
+    latencies = sorted(latencies)
+    print(f"{label:<12} {len(latencies) / elapsed:>9.1f} {statistics.mean(latencies):>9.2f} "
+          f"{latencies[len(latencies) // 2]:>9.2f} {latencies[int(len(latencies) * 0.95)]:>9.2f} {connections:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="stub server latency per request, seconds")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.latency)
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["OPENAI_BASE_URL"] = os.environ["OPENAI_API_BASE"] = f"http://127.0.0.1:{server.server_port}/v1"
+
+    from langchain_openai import ChatOpenAI
+    from llm_clients import LLMClientRegistry
+
+    print(f"{args.requests} chat completions, concurrency {args.concurrency}")
+    print(f"{'client':<12} {'req/s':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'connections':>12}")
+    registry = asyncio.run(compare(args, ChatOpenAI, LLMClientRegistry))
+    print(f"registry stats: {registry.stats()}")
+    server.shutdown()
+
+
+async def compare(args, ChatOpenAI, LLMClientRegistry):
+    # Before: a new ChatOpenAI (and HTTP client) for every request, as /api/chat used to build
+    StubHandler.connections = 0
+    latencies, elapsed = await run(
+        lambda: ChatOpenAI(model="gpt-4o", temperature=0.7), args.requests, args.concurrency
+    )
+    report("per-request", latencies, elapsed, StubHandler.connections)
+    # The abandoned clients close their connections when collected, which needs the loop still running
+    gc.collect()
+    await asyncio.sleep(0.1)
+
+    # After: one pooled model from the registry
+    registry = LLMClientRegistry()
+    StubHandler.connections = 0
+    latencies, elapsed = await run(
+        lambda: registry.get_chat_model(model="gpt-4o", temperature=0.7), args.requests, args.concurrency
+    )
+    report("pooled", latencies, elapsed, StubHandler.connections)
+    await registry.aclose()
+    return registry
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Figure build time and JSON payload size for the dashboard map at growing origin counts.
+
+Compares the original connection lines (one Scattergeo trace per origin) against the single
+trace with None separators the dashboard draws now. Both figures carry the same city marker
+trace; build time covers the traces plus fig.to_json(), which is what reaches the browser.
+Run from backend/:
+
+    python benchmarks/bench_map_figure.py --origins 10 100 1000
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+DUBAI_LON, DUBAI_LAT = 55.2708, 25.2048
+LINE_STYLE = dict(width=1, color='rgba(197, 160, 89, 0.3)', dash='solid')
+
+
+def make_origins(count: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({
+        'city': [f"City {number}" for number in range(count)],
+        'lat': rng.uniform(-60, 70, count).round(4),
+        'lon': rng.uniform(-180, 180, count).round(4),
+        'visitors': rng.integers(1, 500, count)
+    })
+
+
+def add_markers(fig: go.Figure, map_df: pd.DataFrame):
+    fig.add_trace(go.Scattergeo(
+        lon=map_df['lon'].tolist(),
+        lat=map_df['lat'].tolist(),
+        text=map_df['city'] + ': ' + map_df['visitors'].astype(str) + ' visitors',
+        mode='markers+text',
+        marker=dict(size=map_df['visitors'] / map_df['visitors'].max() * 50, color='#C5A059', opacity=0.7),
+        textposition='top center',
+        name='Visitor Origins'
+    ))
+
+
+def trace_per_origin(map_df: pd.DataFrame) -> go.Figure:
+    # The original loop: one two-point line trace for every origin
+    fig = go.Figure()
+    add_markers(fig, map_df)
+    for _, row in map_df.iterrows():
+        fig.add_trace(go.Scattergeo(
+            lon=[row['lon'], DUBAI_LON],
+            lat=[row['lat'], DUBAI_LAT],
+            mode='lines',
+            line=LINE_STYLE,
+            showlegend=False
+        ))
+    return fig
+
+
+def single_trace(map_df: pd.DataFrame) -> go.Figure:
+    fig = go.Figure()
+    add_markers(fig, map_df)
+    line_lon = np.full(len(map_df) * 3, None, dtype=object)
+    line_lat = np.full(len(map_df) * 3, None, dtype=object)
+    line_lon[0::3], line_lon[1::3] = map_df['lon'].to_numpy(), DUBAI_LON
+    line_lat[0::3], line_lat[1::3] = map_df['lat'].to_numpy(), DUBAI_LAT
+    fig.add_trace(go.Scattergeo(lon=line_lon, lat=line_lat, mode='lines', line=LINE_STYLE, showlegend=False))
+    return fig
+
+
+def measure(build, map_df: pd.DataFrame, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fig = build(map_df)
+        payload = fig.to_json()
+        timings.append(time.perf_counter() - started)
+    return len(fig.data), len(payload), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--origins", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'origins':>8} {'figure':<18} {'traces':>7} {'JSON KiB':>10} {'build ms':>10}")
+    for count in args.origins:
+        map_df = make_origins(count)
+        for label, build in (("trace per origin", trace_per_origin), ("single trace", single_trace)):
+            traces, size, elapsed = measure(build, map_df, args.repeats)
+            print(f"{count:>8} {label:<18} {traces:>7} {size / 1024:>10.1f} {elapsed * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import sqlite3
 import os
-import json
 import calendar
+from dashboard_data import PeriodCache, month_name_categories
+from etl_processor import ETLProcessor
+from locations import Location, location_index
+from streaming_stats import DDSketch, IntegerHistogram
 
 # Set page config
 st.set_page_config(
@@ -89,112 +92,68 @@ st.markdown(f"""
     **Analyzing bookings from:** {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}
 """)
 
-@st.cache_data
-def load_data():
-    try:
-        db_path = os.path.join(os.path.dirname(__file__), 'data', 'user_interactions.db')
-        
-        if not os.path.exists(db_path):
-            return pd.DataFrame()
+@st.cache_resource
+def get_period_cache(db_path):
+    """Bring an older database up to the current schema and rollups, then share one cache across sessions"""
+    processor = ETLProcessor(db_path)
+    processor.backfill_typed_columns()
+    processor.close()
+    return PeriodCache(db_path)
 
-        conn = sqlite3.connect(db_path)
-        
-        # Load all data first
-        df = pd.read_sql_query('SELECT * FROM user_interactions', conn)
-        conn.close()
+DB_PATH = os.getenv("ETL_DB_PATH", os.path.join(os.path.dirname(__file__), 'data', 'user_interactions.db'))
 
-        if not df.empty:
-            try:
-                # Debug print
-                st.write("Raw travel dates:", df['travel_dates'].iloc[0])
-                
-                # Parse travel_dates from JSON string
-                df['travel_dates'] = df['travel_dates'].apply(lambda x: json.loads(x) if isinstance(x, str) else x)
-                
-                # Extract start and end dates
-                df['travel_start'] = df['travel_dates'].apply(lambda x: datetime.strptime(x['from'], '%Y-%m-%d').date())
-                df['travel_end'] = df['travel_dates'].apply(lambda x: datetime.strptime(x['to'], '%Y-%m-%d').date())
-                
-                # Convert start_date and end_date to date objects if they're datetime
-                start_date_filter = start_date.date() if isinstance(start_date, datetime) else start_date
-                end_date_filter = end_date.date() if isinstance(end_date, datetime) else end_date
-                
-                # Debug prints
-                st.write("Filter dates:", start_date_filter, "to", end_date_filter)
-                st.write("First row travel dates:", df['travel_start'].iloc[0], "to", df['travel_end'].iloc[0])
-                
-                # Filter based on travel dates
-                mask = (
-                    (df['travel_start'] >= start_date_filter) & 
-                    (df['travel_end'] <= end_date_filter)
-                )
-                df = df[mask]
+def period_filter(start_date, end_date):
+    # Convert start_date and end_date to date objects if they're datetime
+    start_date_filter = start_date.date() if isinstance(start_date, datetime) else start_date
+    end_date_filter = end_date.date() if isinstance(end_date, datetime) else end_date
+    return start_date_filter, end_date_filter
 
-                if df.empty:
-                    st.info(f"No bookings found for the selected period: {start_date_filter} to {end_date_filter}")
-                    return pd.DataFrame()
-                
-            except Exception as e:
-                st.error(f"Error processing dates: {e}")
-                return pd.DataFrame()
+def load_data(start_date, end_date):
+    try:
+        if not os.path.exists(DB_PATH):
+            return None
+
+        start_date_filter, end_date_filter = period_filter(start_date, end_date)
+        data = get_period_cache(DB_PATH).load(start_date_filter.isoformat(), end_date_filter.isoformat())
 
-        return df
+        if data['durations'].empty:
+            st.info(f"No bookings found for the selected period: {start_date_filter} to {end_date_filter}")
+            return None
+
+        return data
 
     except Exception as e:
         st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
+        return None
 
-df = load_data()
+data = load_data(start_date, end_date)
 
-if not df.empty:
+if data is not None:
     # Geographic Analysis
     st.header("Global Visitor Demographics")
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        # Enhanced map visualization
-        city_coordinates = {
-            'London': {'lat': 51.5074, 'lon': -0.1278, 'country': 'GBR'},
-            'Paris': {'lat': 48.8566, 'lon': 2.3522, 'country': 'FRA'},
-            'New York': {'lat': 40.7128, 'lon': -74.0060, 'country': 'USA'},
-            'Tokyo': {'lat': 35.6762, 'lon': 139.6503, 'country': 'JPN'},
-            'Dubai': {'lat': 25.2048, 'lon': 55.2708, 'country': 'ARE'},
-            'Mumbai': {'lat': 19.0760, 'lon': 72.8777, 'country': 'IND'},
-            'Sydney': {'lat': -33.8688, 'lon': 151.2093, 'country': 'AUS'},
-            'Singapore': {'lat': 1.3521, 'lon': 103.8198, 'country': 'SGP'},
-            'Manchester': {'lat': 53.4808, 'lon': -2.2426, 'country': 'GBR'},
-            'Beijing': {'lat': 39.9042, 'lon': 116.4074, 'country': 'CHN'},
-            'Moscow': {'lat': 55.7558, 'lon': 37.6173, 'country': 'RUS'},
-            'Istanbul': {'lat': 41.0082, 'lon': 28.9784, 'country': 'TUR'}
-        }
-        
         # Prepare data for the map
-        visitor_locations = df['departure_location'].value_counts().reset_index()
-        visitor_locations.columns = ['city', 'visitors']
+        visitor_locations = data['origins'].rename(columns={'departure_location': 'city'})
         
-        # Create map data
-        map_data = []
-        for _, row in visitor_locations.iterrows():
-            city = row['city'].title()
-            if city in city_coordinates:
-                map_data.append({
-                    'city': city,
-                    'visitors': row['visitors'],
-                    'lat': city_coordinates[city]['lat'],
-                    'lon': city_coordinates[city]['lon'],
-                    'country': city_coordinates[city]['country']
-                })
-        
-        map_df = pd.DataFrame(map_data)
+        # Resolve each distinct origin against the bundled location index; spellings of the same city merge
+        matched = visitor_locations['city'].map(location_index.lookup)
+        known = matched.notna()
+        map_df = pd.DataFrame(matched[known].tolist(), columns=list(Location._fields)).assign(
+            visitors=visitor_locations.loc[known, 'visitors'].to_numpy()
+        ).groupby(['city', 'country', 'lat', 'lon'], as_index=False)['visitors'].sum()
+        dubai = location_index.lookup('Dubai')
         
         if not map_df.empty:
             fig = go.Figure()
 
             # Base map layer
+            highlighted_countries = pd.unique(pd.concat([map_df['country'], pd.Series([dubai.country])]))
             fig.add_trace(go.Choropleth(
-                locations=list(set(city_coordinates[city]['country'] for city in city_coordinates)),
-                z=[1] * len(set(city_coordinates[city]['country'] for city in city_coordinates)),
+                locations=highlighted_countries,
+                z=[1] * len(highlighted_countries),
                 colorscale=[[0, '#e6f3ff'], [1, '#e6f3ff']],
                 showscale=False,
                 marker_line_color='#ffffff',
@@ -205,7 +164,7 @@ if not df.empty:
             fig.add_trace(go.Scattergeo(
                 lon=map_df['lon'].tolist(),
                 lat=map_df['lat'].tolist(),
-                text=map_df.apply(lambda x: f"{x['city']}: {x['visitors']} visitors", axis=1),
+                text=map_df['city'] + ': ' + map_df['visitors'].astype(str) + ' visitors',
                 mode='markers+text',
                 marker=dict(
                     size=map_df['visitors'] / map_df['visitors'].max() * 50,
@@ -217,20 +176,23 @@ if not df.empty:
                 name='Visitor Origins'
             ))
 
-            # Connection lines to Dubai
-            dubai_coords = city_coordinates['Dubai']
-            for _, row in map_df.iterrows():
-                fig.add_trace(go.Scattergeo(
-                    lon=[row['lon'], dubai_coords['lon']],
-                    lat=[row['lat'], dubai_coords['lat']],
-                    mode='lines',
-                    line=dict(
-                        width=1,
-                        color='rgba(197, 160, 89, 0.3)',
-                        dash='solid'
-                    ),
-                    showlegend=False
-                ))
+            # Connection lines to Dubai, drawn as one trace: each origin contributes
+            # [origin, Dubai, None] and the None breaks the line between segments
+            line_lon = np.full(len(map_df) * 3, None, dtype=object)
+            line_lat = np.full(len(map_df) * 3, None, dtype=object)
+            line_lon[0::3], line_lon[1::3] = map_df['lon'].to_numpy(), dubai.lon
+            line_lat[0::3], line_lat[1::3] = map_df['lat'].to_numpy(), dubai.lat
+            fig.add_trace(go.Scattergeo(
+                lon=line_lon,
+                lat=line_lat,
+                mode='lines',
+                line=dict(
+                    width=1,
+                    color='rgba(197, 160, 89, 0.3)',
+                    dash='solid'
+                ),
+                showlegend=False
+            ))
 
             fig.update_layout(
                 title='Global Distribution of Visitors',
@@ -315,18 +277,16 @@ if not df.empty:
                 </div>
             """, unsafe_allow_html=True)
 
-    def create_peak_travel_analysis(df):
+    def create_peak_travel_analysis(bookings):
         st.header("Peak Travel Dates Analysis")
         
-        # Convert timestamp to datetime if it's not already
-        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-        df = df.dropna(subset=['timestamp'])
+        # One row per booking day from the rollup; drop days that couldn't be parsed
+        df = bookings.dropna(subset=['booking_day']).rename(columns={'booking_day': 'date'})
         
         # Add year and month columns
-        df['year'] = df['timestamp'].dt.year
-        df['month'] = df['timestamp'].dt.month
-        df['month_name'] = df['timestamp'].dt.strftime('%B')
-        df['date'] = df['timestamp'].dt.strftime('%Y-%m-%d')
+        df['year'] = df['date'].dt.year
+        df['month'] = df['date'].dt.month
+        df['month_name'] = month_name_categories(df['month'])
         
         # Create filters in a nice container
         with st.container():
@@ -369,8 +329,7 @@ if not df.empty:
         if granularity == "Daily":
             try:
                 # Daily analysis with proper date handling
-                daily_counts = filtered_df.groupby('date').size().reset_index(name='count')
-                daily_counts['date'] = pd.to_datetime(daily_counts['date'])
+                daily_counts = filtered_df[['date', 'count']]
                 
                 fig_daily = px.line(
                     daily_counts,
@@ -424,7 +383,7 @@ if not df.empty:
                 
         else:
             try:
-                monthly_counts = filtered_df.groupby(['year', 'month_name']).size().reset_index(name='count')
+                monthly_counts = filtered_df.groupby(['year', 'month_name'], observed=True)['count'].sum().reset_index()
                 
                 # Create an enhanced bar chart
                 fig_monthly = px.bar(
@@ -484,9 +443,20 @@ if not df.empty:
             except Exception as e:
                 st.error(f"Error processing monthly data: {str(e)}")
 
-    create_peak_travel_analysis(df)
+    create_peak_travel_analysis(data['bookings'])
+
+    def merge_budget_sketches(budgets):
+        """Combine the period's per-month budget sketches into one"""
+        merged = None
+        for payload in budgets['sketch']:
+            sketch = DDSketch.from_json(payload)
+            if merged is None:
+                merged = sketch
+            else:
+                merged.merge(sketch)
+        return merged
 
-    def create_duration_analysis(df):
+    def create_duration_analysis(durations, seasonal, budgets):
         # Add more padding and margin to the header
         st.markdown("""
             <style>
@@ -540,14 +510,13 @@ if not df.empty:
         # Add spacing between sections
         st.markdown("<div style='height: 2rem'></div>", unsafe_allow_html=True)
 
-        # Create month column from travel_start instead of timestamp
-        df['month'] = pd.to_datetime(df['travel_start']).dt.strftime('%B')
-        
-        # Calculate key metrics
-        avg_duration = df['duration_days'].mean()
-        median_duration = df['duration_days'].median()
-        min_duration = df['duration_days'].min()
-        max_duration = df['duration_days'].max()
+        # Durations are small integers, so the rollup histogram gives exact statistics
+        duration_hist = IntegerHistogram(dict(zip(durations['duration_days'], durations['count'])))
+        avg_duration = duration_hist.mean()
+        median_duration = duration_hist.median()
+        min_duration = duration_hist.min()
+        max_duration = duration_hist.max()
+        mode_duration = duration_hist.mode()
 
         # Create three columns with spacing
         col1, space1, col2, space2, col3 = st.columns([1, 0.1, 1, 0.1, 1])
@@ -580,7 +549,7 @@ if not df.empty:
                     </h3>
                     <p style="color: #666; font-size: 1.1rem;">Most Common Duration</p>
                 </div>
-            """.format(df['duration_days'].mode().iloc[0]), unsafe_allow_html=True)
+            """.format(mode_duration), unsafe_allow_html=True)
 
         # Add spacing before charts
         st.markdown("<div style='height: 3rem'></div>", unsafe_allow_html=True)
@@ -590,8 +559,10 @@ if not df.empty:
 
         with col1:
             fig_hist = px.histogram(
-                df,
+                durations,
                 x='duration_days',
+                y='count',
+                histfunc='sum',
                 nbins=20,
                 title='Distribution of Stay Duration',
                 labels={'duration_days': 'Duration (Days)', 'count': 'Number of Visitors'},
@@ -612,8 +583,12 @@ if not df.empty:
 
         with col2:
             # Create a seasonal analysis
-            seasonal_avg = df.groupby('month')['duration_days'].agg(['mean', 'count']).reset_index()
-            seasonal_avg = seasonal_avg.sort_values('month', key=lambda x: pd.to_datetime(x, format='%B'))
+            # Month names are an ordered categorical, so rows stay in calendar order
+            seasonal_avg = pd.DataFrame({
+                'month': month_name_categories(seasonal['month']),
+                'mean': seasonal['total_days'] / seasonal['count'],
+                'count': seasonal['count']
+            })
             
             fig_seasonal = px.bar(
                 seasonal_avg,
@@ -660,9 +635,17 @@ if not df.empty:
         insights = [
             f"The average stay duration is {avg_duration:.1f} days, with a median of {median_duration:.1f} days.",
             f"Stay durations range from {min_duration:.0f} to {max_duration:.0f} days.",
-            f"Most visitors ({(df['duration_days'].between(avg_duration-2, avg_duration+2).mean()*100):.1f}%) stay within 2 days of the average duration."
+            f"Most visitors ({(duration_hist.fraction_between(avg_duration-2, avg_duration+2)*100):.1f}%) stay within 2 days of the average duration."
         ]
 
+        budget_sketch = merge_budget_sketches(budgets)
+        if budget_sketch is not None and budget_sketch.count:
+            accuracy = budget_sketch.relative_accuracy * 100
+            insights.append(
+                f"The median budget for travel months in this period is about {budget_sketch.quantile(0.5):,.0f}, "
+                f"and 90% of visitors budget under {budget_sketch.quantile(0.9):,.0f} (within {accuracy:g}%)."
+            )
+
         for insight in insights:
             st.markdown(f"""
                 <div class="insight-card">
@@ -673,7 +656,20 @@ if not df.empty:
                 </div>
             """, unsafe_allow_html=True)
 
-    create_duration_analysis(df)
+    create_duration_analysis(data['durations'], data['seasonal'], data['budgets'])
+
+    with st.expander("Booking Records"):
+        # Individual records are only read on request; the charts above come from the rollups
+        if st.checkbox("Load booking records for this period", key="load_records"):
+            try:
+                start_date_filter, end_date_filter = period_filter(start_date, end_date)
+                records = get_period_cache(DB_PATH).load_records(
+                    start_date_filter.isoformat(), end_date_filter.isoformat()
+                )
+                st.caption(f"{len(records)} bookings")
+                st.dataframe(records, use_container_width=True, hide_index=True)
+            except Exception as e:
+                st.error(f"Error loading booking records: {e}")
 
 else:
     st.info("""
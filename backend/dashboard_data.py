@@ -0,0 +1,171 @@
+import calendar
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Without pyarrow, booking records are read from SQLite only
+    pa = None
+    pq = None
+
+MONTH_NAMES = list(calendar.month_name)[1:]
+
+
+def month_name_categories(months):
+    """Map month numbers (1-12) to an ordered categorical of month names without per-row formatting"""
+    return pd.Categorical.from_codes(months - 1, categories=MONTH_NAMES, ordered=True)
+
+
+# Rollup queries for a travel period; each returns one row per bucket, however many interactions there are.
+# Trips are bucketed by day, so durations and seasonality match the period exactly. Origins, booking
+# days and budget sketches are kept per travel month, so they cover every month the period touches.
+TRIPS_IN_PERIOD = "travel_start >= ? AND date(travel_start, (duration_days - 1) || ' days') <= ?"
+MONTHS_IN_PERIOD = "travel_month BETWEEN substr(?, 1, 7) AND substr(?, 1, 7)"
+
+ROLLUP_QUERIES = {
+    'origins': f'''
+        SELECT departure_location, SUM(interactions) AS visitors
+        FROM rollup_origins
+        WHERE {MONTHS_IN_PERIOD}
+        GROUP BY departure_location
+        ORDER BY visitors DESC
+    ''',
+    'bookings': f'''
+        SELECT booking_day, SUM(interactions) AS count
+        FROM rollup_bookings
+        WHERE {MONTHS_IN_PERIOD}
+        GROUP BY booking_day
+        ORDER BY booking_day
+    ''',
+    'durations': f'''
+        SELECT duration_days, SUM(interactions) AS count
+        FROM rollup_trips
+        WHERE {TRIPS_IN_PERIOD}
+        GROUP BY duration_days
+        ORDER BY duration_days
+    ''',
+    'seasonal': f'''
+        SELECT CAST(strftime('%m', travel_start) AS INTEGER) AS month,
+               SUM(duration_days * interactions) AS total_days, SUM(interactions) AS count
+        FROM rollup_trips
+        WHERE {TRIPS_IN_PERIOD}
+        GROUP BY month
+        ORDER BY month
+    ''',
+    'budgets': f'''
+        SELECT travel_month, sketch
+        FROM budget_sketches
+        WHERE {MONTHS_IN_PERIOD}
+    '''
+}
+
+RECORD_COLUMNS = [
+    'interaction_id', 'timestamp', 'departure_location', 'travel_start', 'travel_end',
+    'duration_days', 'group_type', 'budget_amount'
+]
+
+RECORDS_QUERY = f'''
+    SELECT {', '.join(RECORD_COLUMNS)}
+    FROM user_interactions
+    WHERE travel_start >= ? AND travel_end <= ?
+'''
+
+# Rows committed into a month after its export, or in months not exported yet. The partial index
+# holds only these, so exported rows are never visited.
+UNEXPORTED_RECORDS_QUERY = f'''
+    SELECT {', '.join(RECORD_COLUMNS)}
+    FROM user_interactions INDEXED BY idx_user_interactions_unexported
+    WHERE exported = 0 AND travel_start >= ? AND travel_end <= ?
+'''
+
+class PeriodCache:
+    """Caches a period's rollup frames and booking records against the database's data version.
+
+    PRAGMA data_version on a long-lived connection changes whenever another connection commits,
+    so an unchanged database is answered from memory. After any commit the period is re-read in
+    full rather than extended with new rows, since the backfill rewrites travel dates of existing
+    rows in place. Re-reading rollups costs one row per bucket rather than one per interaction.
+    """
+
+    def __init__(self, db_path, max_periods=16):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.max_periods = max_periods
+        # (kind, start, end) -> (data_version, frames), least recently used first
+        self.frames = OrderedDict()
+
+    def load(self, start, end):
+        frames = self._cached(('rollups', start, end), lambda: self._read_rollups(start, end))
+        return {name: frame.copy() for name, frame in frames.items()}
+
+    def load_records(self, start, end):
+        return self._cached(('records', start, end), lambda: self._read_records(start, end)).copy()
+
+    def _cached(self, key, read):
+        with self.lock:
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            cached = self.frames.get(key)
+            if cached is None or cached[0] != data_version:
+                cached = (data_version, read())
+                self.frames[key] = cached
+
+            self.frames.move_to_end(key)
+            while len(self.frames) > self.max_periods:
+                self.frames.popitem(last=False)
+            return cached[1]
+
+    def _read_rollups(self, start, end):
+        frames = {
+            name: pd.read_sql_query(query, self.conn, params=(start, end))
+            for name, query in ROLLUP_QUERIES.items()
+        }
+        frames['bookings']['booking_day'] = pd.to_datetime(
+            frames['bookings']['booking_day'], format='%Y-%m-%d', errors='coerce'
+        )
+        return frames
+
+    def _read_records(self, start, end):
+        """Read the period's interactions from the Parquet export, plus the SQLite rows it doesn't cover"""
+        frames = []
+        # One read transaction, so an export committing between the two reads can't hide its rows from both
+        self.conn.execute("BEGIN")
+        try:
+            if pq is not None:
+                frames.append(self._read_exported(start, end))
+                query = UNEXPORTED_RECORDS_QUERY
+            else:
+                query = RECORDS_QUERY
+            tail = pd.read_sql_query(query, self.conn, params=(start, end))
+        finally:
+            self.conn.rollback()
+        tail['timestamp'] = pd.to_datetime(tail['timestamp'], format='ISO8601', errors='coerce')
+        tail['travel_start'] = pd.to_datetime(tail['travel_start'], format='%Y-%m-%d', errors='coerce')
+        tail['travel_end'] = pd.to_datetime(tail['travel_end'], format='%Y-%m-%d', errors='coerce')
+        frames.append(tail)
+
+        records = pd.concat([frame for frame in frames if not frame.empty] or [tail], ignore_index=True)
+        return records.sort_values('timestamp', ascending=False, ignore_index=True)
+
+    def _read_exported(self, start, end):
+        # Only the travel-month partitions the period touches are opened, and only the needed columns are read
+        paths = [row[0] for row in self.conn.execute('''
+            SELECT path FROM interaction_export_files
+            WHERE travel_month BETWEEN substr(?, 1, 7) AND substr(?, 1, 7)
+        ''', (start, end))]
+        filters = [('travel_start', '>=', date.fromisoformat(start)), ('travel_end', '<=', date.fromisoformat(end))]
+        base_dir = os.path.dirname(self.db_path)
+        tables = [
+            pq.read_table(os.path.join(base_dir, path), columns=RECORD_COLUMNS, filters=filters, memory_map=True)
+            for path in paths
+        ]
+        if not tables:
+            return pd.DataFrame(columns=RECORD_COLUMNS)
+        # Concatenating Arrow tables only chains their chunks; the one copy happens in to_pandas
+        return pa.concat_tables(tables).to_pandas(date_as_object=False)
@@ -1,21 +1,382 @@
 import sqlite3
 import os
-from datetime import datetime
-from typing import Dict, Any
+import re
+import threading
+import time
+import random
+import logging
+from bisect import bisect_left
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Tuple
 import json
+from interaction_ids import new_interaction_id
+from streaming_stats import DDSketch
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Columnar export is optional; without pyarrow everything stays in SQLite
+    pa = None
+    pq = None
+
+logger = logging.getLogger("etl")
+
+# Debug mode logs every stored record; otherwise only a sampled fraction is logged
+ETL_DEBUG = os.getenv("ETL_DEBUG", "false").lower() == "true"
+ETL_LOG_SAMPLE_RATE = float(os.getenv("ETL_LOG_SAMPLE_RATE", "0.0"))
+# Relative error of budget quantiles. Every month's sketch shares one accuracy so they stay mergeable;
+# after a change the stored sketches are rebuilt when a processor starts
+BUDGET_SKETCH_ACCURACY = float(os.getenv("BUDGET_SKETCH_ACCURACY", "0.01"))
+# A locked database is retried with exponential backoff before a batch is counted as failed
+ETL_WRITE_RETRIES = int(os.getenv("ETL_WRITE_RETRIES", "5"))
+ETL_WRITE_RETRY_BACKOFF_SECONDS = float(os.getenv("ETL_WRITE_RETRY_BACKOFF_SECONDS", "0.1"))
+DB_PATH = os.getenv("ETL_DB_PATH", os.path.join(os.path.dirname(__file__), 'data', 'user_interactions.db'))
+
+INSERT_INTERACTION_SQL = '''
+    INSERT INTO user_interactions (
+        interaction_id, timestamp, departure_location, travel_dates, duration_days,
+        group_size, budget, interests, generated_itinerary,
+        travel_start, travel_end, group_type, budget_amount
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_INTEREST_SQL = '''
+    INSERT OR IGNORE INTO interaction_interests (interaction_id, interest) VALUES (?, ?)
+'''
+
+# Ordered schema migrations, tracked through PRAGMA user_version. Version 1 adds typed copies of
+# the free-text columns so date-range queries can use an index instead of parsing every row.
+SCHEMA_MIGRATIONS = [
+    (1, [
+        "ALTER TABLE user_interactions ADD COLUMN travel_start DATE",
+        "ALTER TABLE user_interactions ADD COLUMN travel_end DATE",
+        "ALTER TABLE user_interactions ADD COLUMN group_type TEXT",
+        "ALTER TABLE user_interactions ADD COLUMN budget_amount REAL",
+        '''
+        CREATE TABLE IF NOT EXISTS interaction_interests (
+            interaction_id TEXT NOT NULL REFERENCES user_interactions (interaction_id),
+            interest TEXT NOT NULL,
+            PRIMARY KEY (interaction_id, interest)
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_interaction_interests_interest ON interaction_interests (interest)",
+        "CREATE INDEX IF NOT EXISTS idx_user_interactions_travel_dates ON user_interactions (travel_start, travel_end)",
+        "CREATE INDEX IF NOT EXISTS idx_user_interactions_departure ON user_interactions (departure_location)"
+    ]),
+    # Version 2 adds the dashboard rollups, kept current from a rowid watermark (see refresh_rollups)
+    (2, [
+        '''
+        CREATE TABLE IF NOT EXISTS etl_watermarks (
+            name TEXT PRIMARY KEY,
+            last_rowid INTEGER NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS rollup_trips (
+            travel_start DATE NOT NULL,
+            travel_end DATE NOT NULL,
+            booking_day DATE NOT NULL,
+            duration_days INTEGER,
+            interactions INTEGER NOT NULL,
+            PRIMARY KEY (travel_start, travel_end, booking_day)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS rollup_origins (
+            travel_start DATE NOT NULL,
+            travel_end DATE NOT NULL,
+            departure_location TEXT NOT NULL,
+            interactions INTEGER NOT NULL,
+            PRIMARY KEY (travel_start, travel_end, departure_location)
+        )
+        '''
+    ]),
+    # Version 3 adds per-travel-month budget sketches and rebuilds the rollups so they cover existing rows
+    (3, [
+        '''
+        CREATE TABLE IF NOT EXISTS budget_sketches (
+            travel_month TEXT PRIMARY KEY,
+            sketch TEXT NOT NULL
+        )
+        ''',
+        "DELETE FROM rollup_trips",
+        "DELETE FROM rollup_origins",
+        "DELETE FROM etl_watermarks WHERE name = 'rollups'"
+    ]),
+    # Version 4 records which closed booking months have been exported to Parquet, and the files written
+    (4, [
+        '''
+        CREATE TABLE IF NOT EXISTS interaction_exports (
+            booking_month TEXT PRIMARY KEY,
+            max_rowid INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            exported_at DATETIME NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS interaction_export_files (
+            booking_month TEXT NOT NULL REFERENCES interaction_exports (booking_month),
+            travel_month TEXT NOT NULL,
+            path TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            PRIMARY KEY (travel_month, booking_month)
+        )
+        '''
+    ]),
+    # Version 5 coarsens the rollup keys so bucket counts stop growing with interactions: trips by
+    # (travel_start, duration_days), whose travel_end follows from the two, and origins and booking
+    # days by travel month. The rollups and budget sketches are rebuilt from the first row.
+    (5, [
+        "DROP TABLE IF EXISTS rollup_trips",
+        "DROP TABLE IF EXISTS rollup_origins",
+        '''
+        CREATE TABLE rollup_trips (
+            travel_start DATE NOT NULL,
+            duration_days INTEGER NOT NULL,
+            interactions INTEGER NOT NULL,
+            PRIMARY KEY (travel_start, duration_days)
+        )
+        ''',
+        '''
+        CREATE TABLE rollup_origins (
+            travel_month TEXT NOT NULL,
+            departure_location TEXT NOT NULL,
+            interactions INTEGER NOT NULL,
+            PRIMARY KEY (travel_month, departure_location)
+        )
+        ''',
+        '''
+        CREATE TABLE rollup_bookings (
+            travel_month TEXT NOT NULL,
+            booking_day DATE NOT NULL,
+            interactions INTEGER NOT NULL,
+            PRIMARY KEY (travel_month, booking_day)
+        )
+        ''',
+        "DELETE FROM budget_sketches",
+        "DELETE FROM etl_watermarks WHERE name = 'rollups'"
+    ]),
+    # Version 6 flags the rows a Parquet export covers. The partial index holds only the rest, so
+    # readers find the rows still to be taken from SQLite without visiting exported ones.
+    (6, [
+        "ALTER TABLE user_interactions ADD COLUMN exported BOOLEAN NOT NULL DEFAULT 0",
+        '''
+        UPDATE user_interactions SET exported = 1
+        WHERE rowid <= (
+            SELECT max_rowid FROM interaction_exports e
+            WHERE e.booking_month = strftime('%Y-%m', user_interactions.timestamp)
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_user_interactions_unexported
+        ON user_interactions (travel_start, travel_end) WHERE exported = 0
+        '''
+    ])
+]
+
+# Interactions without travel dates are exported under this travel_month partition
+UNKNOWN_TRAVEL_MONTH = "unknown"
+
+EXPORT_COLUMNS = [
+    "interaction_id", "timestamp", "departure_location", "travel_start", "travel_end", "duration_days",
+    "group_type", "budget_amount", "interests", "generated_itinerary"
+]
+
+EXPORT_SCHEMA = pa.schema([
+    ("interaction_id", pa.string()),
+    ("timestamp", pa.timestamp("us")),
+    ("departure_location", pa.string()),
+    ("travel_start", pa.date32()),
+    ("travel_end", pa.date32()),
+    ("duration_days", pa.int32()),
+    ("group_type", pa.string()),
+    ("budget_amount", pa.float64()),
+    ("interests", pa.string()),
+    ("generated_itinerary", pa.bool_())
+]) if pa is not None else None
+
+ROLLUP_WATERMARK = "rollups"
+# Last rowid examined by backfill_typed_columns
+BACKFILL_WATERMARK = "typed_columns_backfill"
+
+# Each rollup folds the interactions matched by a rowid condition into its buckets. The
+# "WHERE 1" keeps SQLite from reading ON CONFLICT as part of the SELECT's join clause. Trip
+# durations are taken from the typed dates, so travel_end = travel_start + duration_days - 1.
+ROLLUP_SQL = [
+    '''
+    INSERT INTO rollup_trips (travel_start, duration_days, interactions)
+    SELECT travel_start, CAST(julianday(travel_end) - julianday(travel_start) AS INTEGER) + 1 AS duration, COUNT(*)
+    FROM user_interactions
+    WHERE 1 AND {condition} AND travel_start IS NOT NULL AND travel_end IS NOT NULL
+    GROUP BY travel_start, duration
+    ON CONFLICT (travel_start, duration_days) DO UPDATE SET interactions = interactions + excluded.interactions
+    ''',
+    '''
+    INSERT INTO rollup_origins (travel_month, departure_location, interactions)
+    SELECT substr(travel_start, 1, 7) AS travel_month, departure_location, COUNT(*)
+    FROM user_interactions
+    WHERE 1 AND {condition} AND travel_start IS NOT NULL AND travel_end IS NOT NULL AND departure_location IS NOT NULL
+    GROUP BY travel_month, departure_location
+    ON CONFLICT (travel_month, departure_location) DO UPDATE SET interactions = interactions + excluded.interactions
+    ''',
+    '''
+    INSERT INTO rollup_bookings (travel_month, booking_day, interactions)
+    SELECT substr(travel_start, 1, 7) AS travel_month, date(timestamp) AS booking_day, COUNT(*)
+    FROM user_interactions
+    WHERE 1 AND {condition} AND travel_start IS NOT NULL AND travel_end IS NOT NULL AND booking_day IS NOT NULL
+    GROUP BY travel_month, booking_day
+    ON CONFLICT (travel_month, booking_day) DO UPDATE SET interactions = interactions + excluded.interactions
+    '''
+]
+
+GROUP_TYPES = {"solo", "couple", "family", "group"}
+
+
+def parse_travel_dates(travel_dates: Any) -> Tuple[Optional[str], Optional[str]]:
+    """Return ISO (start, end) dates from a dateRange JSON string or dict, or (None, None)"""
+    try:
+        date_range = json.loads(travel_dates) if isinstance(travel_dates, str) else travel_dates
+        start = datetime.strptime(date_range['from'], '%Y-%m-%d').date()
+        end = datetime.strptime(date_range['to'], '%Y-%m-%d').date()
+        return start.isoformat(), end.isoformat()
+    except (TypeError, ValueError, KeyError):
+        return None, None
+
+
+def normalize_group_size(group_size: Any) -> Optional[str]:
+    """Map a free-text group size onto solo/couple/family/group, or 'other'"""
+    if group_size is None or not str(group_size).strip():
+        return None
+    value = str(group_size).strip().lower()
+    return value if value in GROUP_TYPES else "other"
+
+
+def parse_budget(budget: Any) -> Optional[float]:
+    """Parse a budget like '5000', '$5,000' or 5000.0 into a number"""
+    if budget is None:
+        return None
+    if isinstance(budget, (int, float)):
+        return float(budget)
+    try:
+        return float(re.sub(r'[^0-9.\-]', '', str(budget)))
+    except ValueError:
+        return None
+
+
+def split_interests(interests: Any) -> List[str]:
+    """Split a comma-separated interests string into distinct trimmed entries"""
+    if not interests:
+        return []
+    return list(dict.fromkeys(item.strip() for item in str(interests).split(',') if item.strip()))
+
+
+def _enable_record_logging():
+    """Let the 'etl' logger emit INFO record events; under uvicorn the root logger stays at WARNING with no handler"""
+    if logger.getEffectiveLevel() > logging.INFO:
+        logger.setLevel(logging.INFO)
+    if not logger.hasHandlers():
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+        logger.addHandler(handler)
+
+
+def _parse_iso(kind, value: Any):
+    """Parse an ISO date or datetime string, or None for missing and malformed values"""
+    try:
+        return kind.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; recording is O(log buckets) and memory is constant"""
+
+    BUCKET_BOUNDS_MS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
 
-class ETLProcessor:
     def __init__(self):
-        self.db_path = os.path.join(os.path.dirname(__file__), 'data', 'user_interactions.db')
+        self._counts = [0] * (len(self.BUCKET_BOUNDS_MS) + 1)
+        self._total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, latency_ms: float):
+        with self._lock:
+            self._counts[bisect_left(self.BUCKET_BOUNDS_MS, latency_ms)] += 1
+            self._total_ms += latency_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            count = sum(self._counts)
+            labels = [f"<={bound}" for bound in self.BUCKET_BOUNDS_MS] + [f">{self.BUCKET_BOUNDS_MS[-1]}"]
+            return {
+                "count": count,
+                "mean_ms": round(self._total_ms / count, 3) if count else 0.0,
+                "p50_ms": self._quantile(0.5, count),
+                "p95_ms": self._quantile(0.95, count),
+                "p99_ms": self._quantile(0.99, count),
+                "buckets": dict(zip(labels, self._counts))
+            }
+
+    def _quantile(self, q: float, count: int):
+        # Upper bound of the bucket holding the quantile; None when it falls in the overflow bucket
+        if not count:
+            return 0.0
+        seen = 0
+        for bound, bucket_count in zip(self.BUCKET_BOUNDS_MS, self._counts):
+            seen += bucket_count
+            if seen >= q * count:
+                return bound
+        return None
+
+
+class ETLProcessor:
+    """Long-lived writer for user interactions; create one per process and reuse it"""
+
+    def __init__(self, db_path: str = None, debug: bool = None, log_sample_rate: float = None,
+                 budget_sketch_accuracy: float = None, write_retries: int = None, retry_backoff: float = None):
+        self.db_path = db_path or DB_PATH
+        self.debug = ETL_DEBUG if debug is None else debug
+        self.log_sample_rate = ETL_LOG_SAMPLE_RATE if log_sample_rate is None else log_sample_rate
+        if self.debug or self.log_sample_rate > 0:
+            _enable_record_logging()
+        self.budget_sketch_accuracy = (
+            BUDGET_SKETCH_ACCURACY if budget_sketch_accuracy is None else budget_sketch_accuracy
+        )
+        self.write_retries = ETL_WRITE_RETRIES if write_retries is None else write_retries
+        self.retry_backoff = ETL_WRITE_RETRY_BACKOFF_SECONDS if retry_backoff is None else retry_backoff
+        self.write_latency = LatencyHistogram()
+        self.writes = 0
+        self.batches = 0
+        # Invalid records, and valid rows that could not be written
+        self.rejected = 0
+        self.failed = 0
+        self.retries = 0
         self._ensure_data_directory()
+        # A single dedicated writer connection, serialized by a lock since requests arrive on several threads
+        self._lock = threading.Lock()
+        self._closed = False
+        self._conn = self._connect()
         self._init_database()
 
     def _ensure_data_directory(self):
-        data_dir = os.path.join(os.path.dirname(__file__), 'data')
+        data_dir = os.path.dirname(self.db_path)
         os.makedirs(data_dir, exist_ok=True)
 
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=64)
+        # WAL lets the dashboard read while we write; NORMAL sync is durable across app crashes in WAL mode
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+
     def _init_database(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn
         cursor = conn.cursor()
 
         # Update the table schema to include duration_days
@@ -34,51 +395,457 @@ class ETLProcessor:
         ''')
 
         conn.commit()
-        conn.close()
+        self._migrate()
+        self.refresh_rollups()
+        self._rebuild_budget_sketches_on_accuracy_change()
 
-    def store_interaction(self, data: Dict[str, Any]):
-        """Store a user interaction in the database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _migrate(self):
+        """Apply any schema migrations newer than the database's user_version"""
+        conn = self._conn
+        for version, statements in SCHEMA_MIGRATIONS:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                continue
 
-        try:
-            # Debug print
-            print("Storing data:", data)
-            print("Departure location:", data.get('departureLocation'))
-
-            # Calculate duration_days from dateRange
-            date_range = json.loads(data.get('dateRange', '{}'))
-            if date_range and 'from' in date_range and 'to' in date_range:
-                from_date = datetime.strptime(date_range['from'], '%Y-%m-%d')
-                to_date = datetime.strptime(date_range['to'], '%Y-%m-%d')
-                duration = (to_date - from_date).days + 1
+            # IMMEDIATE takes the write lock up front, so concurrent workers migrate one at a time
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    conn.rollback()
+                    continue
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+                logger.info(f"Applied schema migration {version}")
+            except Exception:
+                conn.rollback()
+                raise
+
+    def backfill_typed_columns(self, chunk_size: int = 1000) -> int:
+        """Fill the typed columns and interests table for rows written before migration 1.
+
+        Progress is kept as a rowid watermark, so each row is examined by one backfill only, however
+        many processes start, and rows whose budget or group size is legitimately missing are not
+        rewritten on every start. Within the unexamined range only rows lacking typed values are
+        updated, one transaction per chunk, so live writes can interleave. Each chunk reads the
+        watermark under the write lock, so concurrent backfills never both date the same row.
+        """
+        updated = 0
+        while True:
+            with self._lock:
+                # Stop between chunks if the processor is shut down mid-backfill
+                if self._closed:
+                    break
+                conn = self._conn
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    last_rowid = self._read_watermark(BACKFILL_WATERMARK)
+                    # Rows written after this point get their typed columns when they are stored
+                    end_rowid = conn.execute("SELECT MAX(rowid) FROM user_interactions").fetchone()[0] or 0
+                    if end_rowid <= last_rowid:
+                        conn.rollback()
+                        break
+                    rows = conn.execute('''
+                        SELECT rowid, interaction_id, travel_dates, group_size, budget, interests, travel_start
+                        FROM user_interactions
+                        WHERE rowid > ? AND rowid <= ? AND (travel_start IS NULL OR group_type IS NULL OR budget_amount IS NULL)
+                        ORDER BY rowid
+                        LIMIT ?
+                    ''', (last_rowid, end_rowid, chunk_size)).fetchall()
+
+                    updates = []
+                    interest_rows = []
+                    dated_rowids = []
+                    for rowid, interaction_id, travel_dates, group_size, budget, interests, old_start in rows:
+                        travel_start, travel_end = parse_travel_dates(travel_dates)
+                        updates.append((travel_start, travel_end, normalize_group_size(group_size), parse_budget(budget), rowid))
+                        interest_rows.extend((interaction_id, interest) for interest in split_interests(interests))
+                        if old_start is None and travel_start is not None:
+                            dated_rowids.append(rowid)
+
+                    conn.executemany('''
+                        UPDATE user_interactions
+                        SET travel_start = ?, travel_end = ?, group_type = ?, budget_amount = ?
+                        WHERE rowid = ?
+                    ''', updates)
+                    conn.executemany(INSERT_INTEREST_SQL, interest_rows)
+                    # The rollup job skipped these rows while they had no travel dates; rows past
+                    # the watermark are left for refresh_rollups so nothing is counted twice
+                    if dated_rowids:
+                        watermark = self._rollup_watermark()
+                        self._apply_rollups(
+                            f"rowid IN ({','.join('?' * len(dated_rowids))}) AND rowid <= ?",
+                            (*dated_rowids, watermark)
+                        )
+                    # A short chunk means nothing up to end_rowid is left
+                    finished = len(rows) < chunk_size
+                    self._write_watermark(BACKFILL_WATERMARK, end_rowid if finished else rows[-1][0])
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+
+            updated += len(rows)
+            if finished:
+                break
+
+        if updated:
+            logger.info(f"Backfilled typed columns for {updated} interactions")
+        return updated
+
+    def export_closed_months(self, export_dir: str = None) -> int:
+        """Write every closed, not yet exported booking month to Parquet, partitioned by travel month.
+
+        A booking month is closed once the calendar has moved past it, since interactions are
+        timestamped on arrival. The exported rows are flagged in the same transaction that records
+        the export, so readers take only unflagged rows from SQLite: rows committed after the export,
+        and months not exported yet. The rows stay in SQLite, which remains the source of truth for
+        the rollups.
+        """
+        if pq is None:
+            logger.info("pyarrow is not installed, skipping Parquet export")
+            return 0
+
+        export_dir = export_dir or os.path.join(os.path.dirname(self.db_path), 'interactions_parquet')
+        current_month = datetime.now().strftime('%Y-%m')
+        with self._lock:
+            if self._closed:
+                return 0
+            last_exported = self._conn.execute("SELECT MAX(booking_month) FROM interaction_exports").fetchone()[0]
+            months = [row[0] for row in self._conn.execute('''
+                SELECT DISTINCT strftime('%Y-%m', timestamp) AS booking_month
+                FROM user_interactions
+                WHERE booking_month < ? AND booking_month > ?
+                ORDER BY booking_month
+            ''', (current_month, last_exported or ''))]
+
+        exported = 0
+        for booking_month in months:
+            exported += self._export_month(booking_month, export_dir)
+        return exported
+
+    def _export_month(self, booking_month: str, export_dir: str) -> int:
+        with self._lock:
+            if self._closed:
+                return 0
+            rows = self._conn.execute(f'''
+                SELECT rowid, {', '.join(EXPORT_COLUMNS)}
+                FROM user_interactions
+                WHERE strftime('%Y-%m', timestamp) = ?
+                ORDER BY rowid
+            ''', (booking_month,)).fetchall()
+        if not rows:
+            return 0
+        max_rowid = rows[-1][0]
+
+        partitions: Dict[str, List[tuple]] = {}
+        for row in rows:
+            travel_start = row[4]
+            partitions.setdefault(travel_start[:7] if travel_start else UNKNOWN_TRAVEL_MONTH, []).append(row[1:])
+
+        files = []
+        base_dir = os.path.dirname(self.db_path)
+        for travel_month, partition_rows in partitions.items():
+            partition_dir = os.path.join(export_dir, f"travel_month={travel_month}")
+            os.makedirs(partition_dir, exist_ok=True)
+            # Named by the last exported rowid, so a competing worker that read a different set of rows
+            # never replaces the files of the export that wins the claim below
+            path = os.path.join(partition_dir, f"booked-{booking_month}-r{max_rowid}.parquet")
+            # Write next to the target and rename, so readers never see a half-written file
+            tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            pq.write_table(self._to_arrow(partition_rows), tmp_path)
+            os.replace(tmp_path, path)
+            files.append((booking_month, travel_month, os.path.relpath(path, base_dir), len(partition_rows)))
+
+        with self._lock:
+            if self._closed:
+                return 0
+            with self._conn:
+                # Several workers may export the same month; the first to record it wins
+                claimed = self._conn.execute('''
+                    INSERT OR IGNORE INTO interaction_exports (booking_month, max_rowid, row_count, exported_at)
+                    VALUES (?, ?, ?, ?)
+                ''', (booking_month, max_rowid, len(rows), datetime.now())).rowcount
+                if claimed:
+                    self._conn.executemany('''
+                        INSERT OR REPLACE INTO interaction_export_files (booking_month, travel_month, path, row_count)
+                        VALUES (?, ?, ?, ?)
+                    ''', files)
+                    # Rows committed after the read above stay unflagged and are read from SQLite
+                    self._conn.executemany(
+                        "UPDATE user_interactions SET exported = 1 WHERE rowid = ?", [(row[0],) for row in rows]
+                    )
+                else:
+                    winner_rowid = self._conn.execute(
+                        "SELECT max_rowid FROM interaction_exports WHERE booking_month = ?", (booking_month,)
+                    ).fetchone()[0]
+
+        if not claimed:
+            if winner_rowid != max_rowid:
+                for _, _, path, _ in files:
+                    os.remove(os.path.join(base_dir, path))
+            logger.info(f"Interactions booked in {booking_month} were already exported by another worker")
+            return 0
+
+        logger.info(f"Exported {len(rows)} interactions booked in {booking_month} to {len(files)} Parquet partitions")
+        return len(rows)
+
+    @staticmethod
+    def _to_arrow(rows: List[tuple]) -> "pa.Table":
+        columns = list(zip(*rows))
+        timestamps = [_parse_iso(datetime, value) for value in columns[1]]
+        travel_starts = [_parse_iso(date, value) for value in columns[3]]
+        travel_ends = [_parse_iso(date, value) for value in columns[4]]
+        values = list(columns)
+        values[1], values[3], values[4] = timestamps, travel_starts, travel_ends
+        values[9] = [None if value is None else bool(value) for value in columns[9]]
+        return pa.table(
+            [pa.array(column, type=field.type) for column, field in zip(values, EXPORT_SCHEMA)],
+            schema=EXPORT_SCHEMA
+        )
+
+    def refresh_rollups(self) -> int:
+        """Fold interactions written since the last refresh into the rollup tables.
+
+        The watermark advances in the same transaction as the rollup upserts, and IMMEDIATE takes the
+        write lock before the watermark is read, so every row is counted once even with several
+        processes writing.
+        """
+        with self._lock:
+            if self._closed:
+                return 0
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                watermark = self._rollup_watermark()
+                last_rowid = conn.execute("SELECT MAX(rowid) FROM user_interactions").fetchone()[0] or 0
+                if last_rowid <= watermark:
+                    conn.rollback()
+                    return 0
+                self._apply_rollups("rowid > ? AND rowid <= ?", (watermark, last_rowid))
+                self._write_watermark(ROLLUP_WATERMARK, last_rowid)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return last_rowid - watermark
+
+    def _rollup_watermark(self) -> int:
+        return self._read_watermark(ROLLUP_WATERMARK)
+
+    def _read_watermark(self, name: str) -> int:
+        row = self._conn.execute("SELECT last_rowid FROM etl_watermarks WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def _write_watermark(self, name: str, last_rowid: int):
+        self._conn.execute('''
+            INSERT INTO etl_watermarks (name, last_rowid) VALUES (?, ?)
+            ON CONFLICT (name) DO UPDATE SET last_rowid = excluded.last_rowid
+        ''', (name, last_rowid))
+
+    def _apply_rollups(self, condition: str, params: tuple):
+        for statement in ROLLUP_SQL:
+            self._conn.execute(statement.format(condition=condition), params)
+        self._update_budget_sketches(condition, params)
+
+    def _update_budget_sketches(self, condition: str, params: tuple):
+        """Add the budgets of the matched interactions to their travel month's sketch"""
+        budgets_by_month: Dict[str, List[float]] = {}
+        for travel_month, budget in self._conn.execute(f'''
+            SELECT substr(travel_start, 1, 7), budget_amount
+            FROM user_interactions
+            WHERE {condition} AND travel_start IS NOT NULL AND budget_amount IS NOT NULL
+        ''', params):
+            budgets_by_month.setdefault(travel_month, []).append(budget)
+
+        accuracy = None
+        for travel_month, budgets in budgets_by_month.items():
+            row = self._conn.execute(
+                "SELECT sketch FROM budget_sketches WHERE travel_month = ?", (travel_month,)
+            ).fetchone()
+            if row:
+                sketch = DDSketch.from_json(row[0])
             else:
-                duration = 0
-
-            cursor.execute('''
-                INSERT INTO user_interactions 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                f"int_{datetime.now().strftime('%Y%m%d%H%M%S')}",
-                datetime.now(),
-                data.get('departureLocation'),
-                data.get('dateRange'),
-                duration,
-                data.get('groupSize'),
-                data.get('budget'),
-                data.get('interests'),
-                bool(data.get('travelPlan'))
-            ))
-
-            conn.commit()
-            print("Interaction stored successfully")
-
-            # Debug query to verify data
-            cursor.execute("SELECT * FROM user_interactions")
-            print("Current database contents:", cursor.fetchall())
+                # New months follow the stored sketches, even if this process is configured differently
+                if accuracy is None:
+                    accuracy = self._stored_sketch_accuracy() or self.budget_sketch_accuracy
+                sketch = DDSketch(accuracy)
+            for budget in budgets:
+                sketch.add(budget)
+            self._conn.execute('''
+                INSERT INTO budget_sketches (travel_month, sketch) VALUES (?, ?)
+                ON CONFLICT (travel_month) DO UPDATE SET sketch = excluded.sketch
+            ''', (travel_month, sketch.to_json()))
+
+    def _stored_sketch_accuracy(self) -> Optional[float]:
+        row = self._conn.execute(
+            "SELECT json_extract(sketch, '$.relative_accuracy') FROM budget_sketches LIMIT 1"
+        ).fetchone()
+        return row[0] if row else None
+
+    def _rebuild_budget_sketches_on_accuracy_change(self):
+        """Rebuild every month's sketch when the stored ones were made at a different accuracy"""
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                stored = self._stored_sketch_accuracy()
+                if stored is None or stored == self.budget_sketch_accuracy:
+                    conn.rollback()
+                    return
+                conn.execute("DELETE FROM budget_sketches")
+                self._update_budget_sketches("rowid <= ?", (self._rollup_watermark(),))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        logger.info(f"Rebuilt budget sketches at relative accuracy {self.budget_sketch_accuracy} (was {stored})")
+
+    def store_interaction(self, data: Dict[str, Any]) -> int:
+        """Store a user interaction in the database"""
+        return self.store_interactions([(data, datetime.now())])
+
+    def store_interactions(self, events: List[Tuple[Dict[str, Any], datetime]]) -> int:
+        """Store a batch of (interaction, received_at) pairs in a single transaction, returning how many were stored.
+
+        A locked or busy database is retried with backoff; only rows still unwritten after the last
+        retry count as failed.
+        """
+        rows = []
+        for data, received_at in events:
+            try:
+                rows.append((data, *self._build_record(data, received_at)))
+            except Exception as e:
+                self.rejected += 1
+                self._log_event(logging.ERROR, "interaction_rejected", error=str(e), record=data)
 
+        stored = []
+        pending = rows
+        attempt = 0
+        latency_ms = 0.0
+        error = None
+        while pending:
+            with self._lock:
+                if self._closed:
+                    error = "processor is closed"
+                    break
+                started = time.perf_counter()
+                try:
+                    self._insert_rows(pending, stored)
+                    pending = []
+                    latency_ms = (time.perf_counter() - started) * 1000
+                except sqlite3.OperationalError as e:
+                    # Rows written one at a time before the error are already committed
+                    written = {id(row) for row in stored}
+                    pending = [row for row in pending if id(row) not in written]
+                    error = e
+                except Exception as e:
+                    self.failed += len(pending)
+                    self._log_event(logging.ERROR, "batch_insert_failed", error=str(e), batch_size=len(pending))
+                    pending = []
+                    break
+            if pending:
+                if attempt >= self.write_retries:
+                    break
+                attempt += 1
+                self.retries += 1
+                self._log_event(logging.WARNING, "batch_insert_retry", error=str(error), attempt=attempt,
+                                batch_size=len(pending))
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+        if pending:
+            self.failed += len(pending)
+            self._log_event(logging.ERROR, "batch_insert_failed", error=str(error), batch_size=len(pending),
+                            attempts=attempt + 1)
+        if not stored:
+            return 0
+
+        self.write_latency.observe(latency_ms)
+        self.batches += 1
+        self.writes += len(stored)
+        try:
+            self.refresh_rollups()
         except Exception as e:
-            print(f"Error storing interaction: {e}")
-            conn.rollback()
-        finally:
-            conn.close()
\ No newline at end of file
+            # The rows are stored; the next refresh picks them up from the watermark
+            self._log_event(logging.ERROR, "rollup_refresh_failed", error=str(e))
+        for data, row, _ in stored:
+            if self._should_log_record():
+                self._log_event(logging.INFO, "interaction_stored",
+                                interaction_id=row[0], batch_latency_ms=round(latency_ms, 3), record=data)
+        return len(stored)
+
+    def _insert_rows(self, rows: List[tuple], stored: List[tuple]):
+        """Insert rows in one transaction, appending them to stored; operational errors propagate"""
+        conn = self._conn
+        try:
+            with conn:
+                conn.executemany(INSERT_INTERACTION_SQL, [row for _, row, _ in rows])
+                conn.executemany(INSERT_INTEREST_SQL, [item for _, _, interests in rows for item in interests])
+            stored.extend(rows)
+        except sqlite3.IntegrityError as e:
+            # One conflicting row shouldn't sink the whole batch; retry the rows individually
+            self._log_event(logging.WARNING, "batch_insert_conflict", error=str(e), batch_size=len(rows))
+            self._store_rows_individually(rows, stored)
+
+    def _store_rows_individually(self, rows: List[tuple], stored: List[tuple]):
+        for item in rows:
+            data, row, interests = item
+            try:
+                with self._conn:
+                    self._conn.execute(INSERT_INTERACTION_SQL, row)
+                    self._conn.executemany(INSERT_INTEREST_SQL, interests)
+                stored.append(item)
+            except sqlite3.IntegrityError as e:
+                self.failed += 1
+                self._log_event(logging.ERROR, "interaction_store_failed", error=str(e), record=data)
+
+    def _build_record(self, data: Dict[str, Any], received_at: datetime) -> Tuple[tuple, List[tuple]]:
+        """Build the user_interactions row and interest rows for one interaction"""
+        # Calculate duration_days from dateRange
+        date_range = json.loads(data.get('dateRange', '{}'))
+        if date_range and 'from' in date_range and 'to' in date_range:
+            from_date = datetime.strptime(date_range['from'], '%Y-%m-%d')
+            to_date = datetime.strptime(date_range['to'], '%Y-%m-%d')
+            duration = (to_date - from_date).days + 1
+            travel_start, travel_end = from_date.date().isoformat(), to_date.date().isoformat()
+        else:
+            duration = 0
+            travel_start, travel_end = None, None
+
+        interaction_id = new_interaction_id()
+        row = (
+            interaction_id,
+            received_at,
+            data.get('departureLocation'),
+            data.get('dateRange'),
+            duration,
+            data.get('groupSize'),
+            data.get('budget'),
+            data.get('interests'),
+            bool(data.get('travelPlan')),
+            travel_start,
+            travel_end,
+            normalize_group_size(data.get('groupSize')),
+            parse_budget(data.get('budget'))
+        )
+        interests = [(interaction_id, interest) for interest in split_interests(data.get('interests'))]
+        return row, interests
+
+    def _should_log_record(self) -> bool:
+        return self.debug or (self.log_sample_rate > 0 and random.random() < self.log_sample_rate)
+
+    def _log_event(self, level: int, event: str, **fields):
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({"event": event, **fields}, default=str))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "writes": self.writes,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "retries": self.retries,
+            "debug": self.debug,
+            "log_sample_rate": self.log_sample_rate,
+            "write_latency": self.write_latency.snapshot()
+        }
\ No newline at end of file
@@ -0,0 +1,94 @@
+from collections import deque
+from typing import Dict, Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+V = TypeVar("V")
+
+_NO_MATCH = float("inf")
+
+# Below this many phrases a plain `in` test per phrase runs in C and beats walking the automaton in
+# Python (benchmarks/bench_gazetteer.py puts the crossover near 100)
+LINEAR_SCAN_MAX_PHRASES = 100
+
+
+class Gazetteer(Generic[V]):
+    """Case-insensitive substring matcher over many phrases, built once as an Aho-Corasick automaton.
+
+    match() scans the text a single time regardless of how many phrases there are. When several
+    phrases occur, the one declared first wins, which is what a linear `if phrase in text` scan over
+    the entries in order would return. Small tables are matched with exactly that scan instead.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, V]], default: Optional[V] = None,
+                 linear_scan_max_phrases: int = LINEAR_SCAN_MAX_PHRASES):
+        self.default = default
+        # Per state: outgoing transitions, failure link, and the best (lowest) priority matched there
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[float] = [_NO_MATCH]
+        self._phrases: List[Tuple[str, V]] = [(phrase.lower(), value) for phrase, value in entries if phrase]
+        self._linear = len(self._phrases) <= linear_scan_max_phrases
+        if not self._linear:
+            for priority, (phrase, _) in enumerate(self._phrases):
+                self._add(phrase, priority)
+            self._link()
+
+    @classmethod
+    def from_groups(cls, groups: Dict[V, Sequence[str]], default: Optional[V] = None,
+                    linear_scan_max_phrases: int = LINEAR_SCAN_MAX_PHRASES) -> "Gazetteer[V]":
+        """Build from {value: [phrases]}; earlier groups take priority over later ones"""
+        return cls(((phrase, value) for value, phrases in groups.items() for phrase in phrases), default,
+                   linear_scan_max_phrases)
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    def match(self, text: str) -> Optional[V]:
+        """Value of the highest-priority phrase found in text, or the default"""
+        if not text:
+            return self.default
+        if self._linear:
+            text = text.lower()
+            for phrase, value in self._phrases:
+                if phrase in text:
+                    return value
+            return self.default
+        goto, fail, best_at = self._goto, self._fail, self._best
+        state = 0
+        best = _NO_MATCH
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best_at[state] < best:
+                best = best_at[state]
+                if best == 0:
+                    break
+        return self._phrases[int(best)][1] if best != _NO_MATCH else self.default
+
+    def _add(self, phrase: str, priority: int):
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(_NO_MATCH)
+            state = next_state
+        # A repeated phrase keeps its first declaration
+        self._best[state] = min(self._best[state], priority)
+
+    def _link(self):
+        # Breadth-first, so each state's failure target is finished before the state itself
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # Phrases ending at the failure state end here too
+                self._best[next_state] = min(self._best[next_state], self._best[self._fail[next_state]])
+                queue.append(next_state)
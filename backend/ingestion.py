@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from etl_processor import ETLProcessor
+
+_STOP = object()
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the queue stays full for longer than the enqueue timeout"""
+
+
+class IngestionQueue:
+    """Accepts interaction events immediately and writes them to SQLite in batches off the event loop.
+
+    A batch is flushed once it reaches max_batch_size or flush_interval seconds after its first
+    event, whichever comes first. Callers wait up to enqueue_timeout for space when the queue is
+    full, and stop() flushes everything accepted, including puts still waiting for space when it
+    was called. stats() reports accepted events as stored or failed once their batch has been written.
+    """
+
+    def __init__(self, processor: ETLProcessor, max_batch_size: int = 500, flush_interval: float = 0.25,
+                 max_queue_size: int = 10000, enqueue_timeout: float = 2.0):
+        self.processor = processor
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closed = True
+        # put() calls in progress; stop() waits for them so their events queue ahead of the sentinel
+        self._putters = 0
+        self._putters_done: Optional[asyncio.Event] = None
+        self.accepted = 0
+        self.rejected = 0
+        self.stored = 0
+        self.failed = 0
+        self.batches = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._putters_done = asyncio.Event()
+        self._putters_done.set()
+        self._closed = False
+        self._worker = asyncio.create_task(self._run())
+
+    async def put(self, data: Dict[str, Any]):
+        """Queue an interaction, waiting briefly for space when the queue is full"""
+        if self._closed:
+            raise IngestionQueueFull("Ingestion queue is not accepting events")
+        self._putters += 1
+        self._putters_done.clear()
+        try:
+            await asyncio.wait_for(self._queue.put((data, datetime.now())), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise IngestionQueueFull(f"Ingestion queue full ({self.max_queue_size} events)")
+        finally:
+            self._putters -= 1
+            if not self._putters:
+                self._putters_done.set()
+        self.accepted += 1
+
+    async def stop(self):
+        """Stop accepting events and flush everything already queued"""
+        if self._closed:
+            return
+        self._closed = True
+        # A put() waiting for space can still be handed a slot; the worker keeps draining until it
+        # lands or times out, so nothing accepted ends up behind the sentinel
+        await self._putters_done.wait()
+        await self._queue.put(_STOP)
+        await self._worker
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            event = await self._queue.get()
+            if event is _STOP:
+                break
+
+            batch = [event]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                try:
+                    if self._queue.empty():
+                        event = await asyncio.wait_for(self._queue.get(), timeout=max(deadline - loop.time(), 0))
+                    else:
+                        event = self._queue.get_nowait()
+                except asyncio.TimeoutError:
+                    break
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        # The processor retries a locked database itself and returns how many events it stored
+        try:
+            stored = await asyncio.to_thread(self.processor.store_interactions, batch)
+        except Exception as e:
+            logging.error(f"Error flushing interaction batch of {len(batch)}: {str(e)}")
+            stored = 0
+        if stored < len(batch):
+            logging.error(f"{len(batch) - stored} of {len(batch)} interactions in a batch were not stored")
+        self.stored += stored
+        self.failed += len(batch) - stored
+        self.batches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_size": self.max_queue_size,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "stored": self.stored,
+            "failed": self.failed,
+            "batches": self.batches
+        }
@@ -2,6 +2,7 @@ from etl_processor import ETLProcessor
 
 def initialize_database():
     processor = ETLProcessor()
+    processor.close()
     print("Database initialized successfully!")
 
 if __name__ == "__main__":
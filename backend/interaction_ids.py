@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+
+# Crockford base32, which sorts in the same order as the values it encodes
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+
+
+def _encode(value: int) -> str:
+    chars = []
+    for _ in range(26):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+class InteractionIdGenerator:
+    """ULID-style IDs: a 48-bit millisecond timestamp followed by 80 random bits, base32-encoded.
+
+    IDs sort by creation time, which keeps primary-key inserts append-mostly. Within one process
+    they are strictly increasing: a second ID in the same millisecond increments the random part
+    instead of drawing a new one. Separate processes draw independent randomness, so collisions
+    across workers need two identical 80-bit draws in the same millisecond.
+    """
+
+    def __init__(self, prefix: str = "int_"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new_id(self) -> str:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms <= self._last_ms:
+                # Same millisecond, or the clock stepped back: stay on the last timestamp and count up
+                now_ms = self._last_ms
+                self._last_random += 1
+                if self._last_random >= 1 << _RANDOM_BITS:
+                    now_ms += 1
+                    self._last_random = int.from_bytes(os.urandom(10), "big") >> 1
+            else:
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            self._last_ms = now_ms
+            value = (now_ms << _RANDOM_BITS) | self._last_random
+        return self.prefix + _encode(value)
+
+    def reset(self):
+        """Forget the monotonic state so a forked child doesn't continue its parent's sequence"""
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+
+interaction_ids = InteractionIdGenerator()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=interaction_ids.reset)
+
+
+def new_interaction_id() -> str:
+    return interaction_ids.new_id()
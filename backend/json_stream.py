@@ -0,0 +1,224 @@
+import json
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class JSONExtractionError(ValueError):
+    """Raised when model output contains no usable JSON object"""
+
+
+class ArrayItemParser:
+    """Incrementally scans a JSON token stream and returns each complete item of the array at key_path.
+
+    Text before the first '{' (e.g. a ```json fence) is ignored, as is anything after the
+    top-level object closes. Items are decoded as soon as their closing bracket arrives. The
+    parser also remembers where the top-level object and each of its object/array members
+    start and end, so a truncated stream can still be mined for whatever did complete.
+    """
+
+    def __init__(self, key_path: Sequence[str]):
+        self.key_path = tuple(key_path)
+        self.text = ""
+        self.items: List[Any] = []
+        self._pos = 0
+        self._root_span: Optional[Tuple[int, int]] = None
+        # Completed container members of the top-level object: key -> (start, end)
+        self._member_spans: Dict[str, Tuple[int, int]] = {}
+        self._member_start = None
+        # Open containers, innermost last: [kind, current key, expecting key, is target array]
+        self._stack: List[list] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._item_start = None
+        self._item_depth = 0
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume the next chunk of text and return any array items completed by it"""
+        self.text += chunk
+        items = []
+        text = self.text
+        stack = self._stack
+        i = self._pos
+
+        while i < len(text) and not self.done:
+            ch = text[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    frame = stack[-1]
+                    if frame[0] == "{" and frame[2]:
+                        frame[1] = json.loads(text[self._string_start:i + 1])
+                        frame[2] = False
+            elif not stack:
+                if ch == "{":
+                    stack.append(["{", None, True, False])
+                    self._root_span = (i, None)
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == "{" or ch == "[":
+                parent = stack[-1]
+                if parent[3] and self._item_start is None:
+                    self._item_start = i
+                    self._item_depth = len(stack) + 1
+                if len(stack) == 1:
+                    self._member_start = i
+                is_target = ch == "[" and self._path_matches()
+                stack.append([ch, None, ch == "{", is_target])
+            elif ch == "}" or ch == "]":
+                if self._item_start is not None and len(stack) == self._item_depth:
+                    items.append(json.loads(text[self._item_start:i + 1]))
+                    self._item_start = None
+                if len(stack) == 2 and self._member_start is not None and stack[0][1] is not None:
+                    self._member_spans[stack[0][1]] = (self._member_start, i + 1)
+                    self._member_start = None
+                stack.pop()
+                if not stack:
+                    self._root_span = (self._root_span[0], i + 1)
+                    self.done = True
+            elif ch == ",":
+                frame = stack[-1]
+                if frame[0] == "{":
+                    frame[2] = True
+
+            i += 1
+
+        self._pos = i
+        self.items.extend(items)
+        return items
+
+    @property
+    def started(self) -> bool:
+        """Whether the top-level object has begun"""
+        return self._root_span is not None
+
+    @property
+    def object_text(self) -> Optional[str]:
+        """The complete top-level object, once its closing brace has been seen"""
+        if self._root_span is None or self._root_span[1] is None:
+            return None
+        return self.text[self._root_span[0]:self._root_span[1]]
+
+    def member(self, key: str) -> Any:
+        """Decoded value of a completed object/array member of the top-level object, or None"""
+        span = self._member_spans.get(key)
+        return json.loads(self.text[span[0]:span[1]]) if span else None
+
+    def _path_matches(self) -> bool:
+        # The array being opened sits under the current key of every enclosing object
+        if not all(frame[0] == "{" for frame in self._stack):
+            return False
+        return tuple(frame[1] for frame in self._stack) == self.key_path
+
+
+def conform_to_schema(value: Any, schema: Any, path: str = "$") -> Tuple[Any, List[str]]:
+    """Check value against a minimal schema, returning (value, problems); problems is empty when valid.
+
+    A dict schema requires each of its keys (extra keys are allowed), a one-element list schema
+    means an array whose items all match that element, and a type or tuple of types is checked
+    with isinstance. Booleans only satisfy a schema that names bool, even though bool subclasses int.
+    Models often quote numbers, so where int or float is expected a numeric string such as "150"
+    is accepted and converted, as is an integral float such as 1.0 where only int is expected.
+    """
+    if isinstance(schema, dict):
+        if not isinstance(value, dict):
+            return value, [f"{path}: expected object, got {type(value).__name__}"]
+        conformed = dict(value)
+        errors = []
+        for key, sub_schema in schema.items():
+            if key not in value:
+                errors.append(f"{path}: missing key '{key}'")
+            else:
+                conformed[key], sub_errors = conform_to_schema(value[key], sub_schema, f"{path}.{key}")
+                errors.extend(sub_errors)
+        return conformed, errors
+    if isinstance(schema, list):
+        if not isinstance(value, list):
+            return value, [f"{path}: expected array, got {type(value).__name__}"]
+        conformed = []
+        errors = []
+        for index, item in enumerate(value):
+            item, item_errors = conform_to_schema(item, schema[0], f"{path}[{index}]")
+            conformed.append(item)
+            errors.extend(item_errors)
+        return conformed, errors
+
+    types = schema if isinstance(schema, tuple) else (schema,)
+    if not isinstance(value, bool) or bool in types:
+        if isinstance(value, types):
+            return value, []
+        number = _as_number(value, types)
+        if number is not None:
+            return number, []
+    expected = "/".join(t.__name__ for t in types)
+    return value, [f"{path}: expected {expected}, got {type(value).__name__}"]
+
+
+def _as_number(value: Any, types: Tuple[type, ...]) -> Optional[Any]:
+    # The value as the first of int/float in types that represents it exactly, or None
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+    elif isinstance(value, float):
+        number = value
+    else:
+        return None
+    if not math.isfinite(number):
+        return None
+    if int in types and number.is_integer():
+        return int(number)
+    if float in types:
+        return number
+    return None
+
+
+def validate_schema(value: Any, schema: Any, path: str = "$") -> List[str]:
+    """Problems found by conform_to_schema, empty when value matches schema"""
+    return conform_to_schema(value, schema, path)[1]
+
+
+def extract_validated_object(parser: ArrayItemParser, schema: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """Return (object, complete) from everything the parser has consumed, conformed to schema.
+
+    complete is True when the top-level object closed, decoded and matches schema. Otherwise the
+    object is rebuilt from what did complete: the items of the parser's array that match the
+    array's item schema, plus any other schema members that closed and validate. Members that
+    could not be recovered are left out.
+    """
+    text = parser.object_text
+    if text is not None:
+        try:
+            value, errors = conform_to_schema(json.loads(text), schema)
+            if not errors:
+                return value, True
+        except json.JSONDecodeError:
+            pass
+
+    if not parser.started:
+        raise JSONExtractionError("No JSON object found in model output")
+
+    array_key = parser.key_path[-1] if len(parser.key_path) == 1 else None
+    salvaged = {}
+    for key, sub_schema in schema.items():
+        if key == array_key and isinstance(sub_schema, list):
+            items = [conform_to_schema(item, sub_schema[0]) for item in parser.items]
+            salvaged[key] = [item for item, errors in items if not errors]
+            continue
+        try:
+            value = parser.member(key)
+        except json.JSONDecodeError:
+            continue
+        if value is not None:
+            value, errors = conform_to_schema(value, sub_schema)
+            if not errors:
+                salvaged[key] = value
+    return salvaged, False
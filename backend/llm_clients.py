@@ -0,0 +1,85 @@
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+
+
+class LLMClientRegistry:
+    """Hands out ChatOpenAI models that share one keep-alive connection pool per sync/async client"""
+
+    def __init__(self, max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 60.0, timeout: float = 60.0):
+        self.timeout = timeout
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._http_client = httpx.Client(limits=limits, timeout=timeout, event_hooks={"request": [self._on_request]})
+        self._async_http_client = httpx.AsyncClient(
+            limits=limits, timeout=timeout, event_hooks={"request": [self._on_async_request]}
+        )
+        self._models: Dict[tuple, ChatOpenAI] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    def get_chat_model(self, model: str = "gpt-4o", temperature: float = 0.7,
+                       timeout: Optional[float] = None) -> ChatOpenAI:
+        """Return the shared chat model for these settings, creating it on first use"""
+        timeout = self.timeout if timeout is None else timeout
+        key = (model, temperature, timeout)
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = ChatOpenAI(
+                    model=model,
+                    temperature=temperature,
+                    client=openai.OpenAI(http_client=self._http_client, timeout=timeout).chat.completions,
+                    async_client=openai.AsyncOpenAI(
+                        http_client=self._async_http_client, timeout=timeout
+                    ).chat.completions
+                )
+            return self._models[key]
+
+    async def aclose(self):
+        self._http_client.close()
+        await self._async_http_client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(self.requests - self.connections_opened, 0)
+            return {
+                "models": len(self._models),
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": reused,
+                "reuse_rate": round(reused / self.requests, 4) if self.requests else 0.0
+            }
+
+    # httpcore reports connection setup through the per-request "trace" extension, which tells
+    # apart requests that opened a new connection from ones served by a pooled keep-alive connection
+
+    def _on_request(self, request: httpx.Request):
+        self._count_request()
+        request.extensions["trace"] = self._trace
+
+    async def _on_async_request(self, request: httpx.Request):
+        self._count_request()
+        request.extensions["trace"] = self._async_trace
+
+    def _trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.complete":
+            self._count_connection()
+
+    async def _async_trace(self, event_name: str, info: Dict[str, Any]):
+        self._trace(event_name, info)
+
+    def _count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def _count_connection(self):
+        with self._lock:
+            self.connections_opened += 1
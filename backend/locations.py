@@ -0,0 +1,206 @@
+import difflib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from search_cache import SearchCache
+
+LOCATIONS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'locations.tsv')
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+class Location(NamedTuple):
+    city: str
+    iata: str
+    country: str  # ISO 3166-1 alpha-3, as used by Plotly's choropleth locations
+    lat: float
+    lon: float
+
+
+def normalize_place_name(name: str) -> str:
+    """Lowercase, strip accents and punctuation, and collapse whitespace: 'Zürich ' -> 'zurich'"""
+    decomposed = unicodedata.normalize('NFKD', name)
+    ascii_name = decomposed.encode('ascii', 'ignore').decode('ascii').lower()
+    return _NON_ALNUM.sub(' ', ascii_name).strip()
+
+
+class LocationIndex:
+    """Offline city index: exact lookup by normalized name, alias or IATA code, then prefix, then fuzzy.
+
+    Records are held column-wise (coordinates in float arrays) and every name maps to a row number,
+    so exact lookups are one dict probe. Prefix lookups bisect a sorted list of names.
+    """
+
+    def __init__(self, rows: List[tuple], fuzzy_cutoff: float = 0.85, min_prefix_length: int = 3):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.min_prefix_length = min_prefix_length
+        self.cities: List[str] = []
+        self.iata: List[str] = []
+        self.countries: List[str] = []
+        self.lats = array('d')
+        self.lons = array('d')
+        self._by_name = {}
+        self._by_code = {}
+        for city, iata, country, lat, lon, aliases in rows:
+            row = len(self.cities)
+            self.cities.append(city)
+            self.iata.append(iata)
+            self.countries.append(country)
+            self.lats.append(lat)
+            self.lons.append(lon)
+            self._by_code.setdefault(iata.lower(), row)
+            for name in [city, *aliases]:
+                # The first city listed keeps a shared name
+                self._by_name.setdefault(normalize_place_name(name), row)
+        self._sorted_names = sorted(self._by_name)
+
+    @classmethod
+    def from_file(cls, path: str = LOCATIONS_PATH, **kwargs) -> "LocationIndex":
+        """Load a tab-separated file of city, IATA code, ISO3 country, lat, lon and pipe-separated aliases"""
+        rows = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip() or line.startswith('#'):
+                    continue
+                city, iata, country, lat, lon, aliases = line.rstrip('\n').split('\t')
+                rows.append((city, iata, country, float(lat), float(lon), [a for a in aliases.split('|') if a]))
+        return cls(rows, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def lookup(self, name: str) -> Optional[Location]:
+        """Best match for a free-text place such as 'new york', 'Zurich, Switzerland', 'dxb' or 'Barcelna'"""
+        if not name:
+            return None
+        key = normalize_place_name(name)
+        row = self._find(key)
+        if row is None and ',' in name:
+            # 'Paris, France' -> 'Paris'
+            row = self._find(normalize_place_name(name.split(',', 1)[0]))
+        return self._location(row) if row is not None else None
+
+    def _find(self, key: str) -> Optional[int]:
+        if not key:
+            return None
+        row = self._by_name.get(key)
+        if row is None and len(key) == 3:
+            row = self._by_code.get(key)
+        if row is None:
+            row = self._find_prefix(key)
+        if row is None:
+            matches = difflib.get_close_matches(key, self._sorted_names, n=1, cutoff=self.fuzzy_cutoff)
+            if matches:
+                row = self._by_name[matches[0]]
+        return row
+
+    def _find_prefix(self, key: str) -> Optional[int]:
+        # Shortest name starting with the key, e.g. 'san fran' -> 'san francisco'
+        if len(key) < self.min_prefix_length:
+            return None
+        best = None
+        position = bisect_left(self._sorted_names, key)
+        while position < len(self._sorted_names) and self._sorted_names[position].startswith(key):
+            name = self._sorted_names[position]
+            if best is None or len(name) < len(best):
+                best = name
+            position += 1
+        return self._by_name[best] if best is not None else None
+
+    def _location(self, row: int) -> Location:
+        return Location(self.cities[row], self.iata[row], self.countries[row], self.lats[row], self.lons[row])
+
+
+location_index = LocationIndex.from_file()
+
+
+class AirportCodeResolver:
+    """Resolves cities to IATA codes from the location index, falling back to a remote lookup.
+
+    Remote answers are cached for ttl_seconds, and cities the remote lookup could not resolve are
+    cached for negative_ttl_seconds, so a repeated unknown origin costs at most one network call
+    per window. A lookup that raises is not an answer and is never cached, so the next call retries.
+    Concurrent misses for the same city wait for the first caller's lookup.
+    """
+
+    # Cached in the negative cache; SearchCache treats None as a miss
+    _NOT_FOUND = ""
+
+    def __init__(self, index: LocationIndex, ttl_seconds: float = 86400, negative_ttl_seconds: float = 3600,
+                 max_entries: int = 1024):
+        self.index = index
+        self._found = SearchCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._not_found = SearchCache(ttl_seconds=negative_ttl_seconds, max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, threading.Event] = {}
+        self.index_hits = 0
+        self.remote_lookups = 0
+        self.remote_errors = 0
+
+    def resolve(self, city: str, remote_lookup: Callable[[str], Optional[str]]) -> Optional[str]:
+        """Return the IATA code for city, or None if neither the index nor remote_lookup knows it"""
+        location = self.index.lookup(city)
+        if location:
+            with self._lock:
+                self.index_hits += 1
+            return location.iata
+
+        key = normalize_place_name(city or "")
+        while True:
+            cached = self._found.get(key)
+            if cached is not None:
+                return cached
+            if self._not_found.get(key) is not None:
+                return None
+
+            with self._lock:
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    pending = self._in_flight[key] = threading.Event()
+                    break
+            # Another thread is looking this city up; use its result once it lands in a cache
+            pending.wait()
+
+        try:
+            code = self._lookup(city, remote_lookup)
+        except Exception:
+            # Leave both caches alone; an outage shouldn't pin the city to "not found"
+            return None
+        else:
+            if code:
+                self._found.set(key, code)
+            else:
+                self._not_found.set(key, self._NOT_FOUND)
+            return code
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            pending.set()
+
+    def _lookup(self, city: str, remote_lookup: Callable[[str], Optional[str]]) -> Optional[str]:
+        with self._lock:
+            self.remote_lookups += 1
+        try:
+            return remote_lookup(city)
+        except Exception as e:
+            with self._lock:
+                self.remote_errors += 1
+            logging.error(f"Error resolving airport code for {city}: {str(e)}")
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "index_size": len(self.index),
+                "index_hits": self.index_hits,
+                "remote_lookups": self.remote_lookups,
+                "remote_errors": self.remote_errors,
+                "found_cache": self._found.stats(),
+                "not_found_cache": self._not_found.stats()
+            }
@@ -0,0 +1,70 @@
+import re
+
+BOLD_PATTERN = re.compile(r'\*\*(.*?)\*\*')
+ITALIC_PATTERN = re.compile(r'\*(.*?)\*')
+# Horizontal whitespace only, so a bullet never swallows the line breaks around it
+BULLET_PATTERN = re.compile(r'^[ \t]*[-•][ \t]*', re.MULTILINE)
+# A line start that could still turn out to be a bullet once more text arrives
+BULLET_PREFIX_PATTERN = re.compile(r'[ \t]*[-•]?[ \t]*$')
+
+
+def strip_markdown_emphasis(text: str) -> str:
+    """Remove bold and italic markers, keeping their content"""
+    text = BOLD_PATTERN.sub(r'\1', text)
+    return ITALIC_PATTERN.sub(r'\1', text)
+
+
+def clean_markdown(text: str) -> str:
+    """Remove markdown formatting from text."""
+    return BULLET_PATTERN.sub('', strip_markdown_emphasis(text))
+
+
+class MarkdownStreamCleaner:
+    """Applies clean_markdown to a token stream line by line, releasing text as soon as it can no longer change.
+
+    Emphasis markers never span lines, so text before the first '*' of a line is final once the
+    line is known not to start with a bullet; anything from that '*' on is held until the line ends.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        # Whether part of the current line has already been released
+        self._line_started = False
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk of model output and return the cleaned text that is now safe to send"""
+        self._pending += chunk
+        released = []
+        while "\n" in self._pending:
+            line, self._pending = self._pending.split("\n", 1)
+            released.append(self._finish_line(line) + "\n")
+        released.append(self._release_partial_line())
+        return "".join(released)
+
+    def flush(self) -> str:
+        """Return whatever is left once the stream has ended"""
+        text = self._finish_line(self._pending)
+        self._pending = ""
+        return text
+
+    def _finish_line(self, line: str) -> str:
+        text = strip_markdown_emphasis(line) if self._line_started else clean_markdown(line)
+        self._line_started = False
+        return text
+
+    def _release_partial_line(self) -> str:
+        star = self._pending.find("*")
+        safe = self._pending if star < 0 else self._pending[:star]
+        if not safe:
+            return ""
+
+        if not self._line_started:
+            if BULLET_PREFIX_PATTERN.match(safe):
+                return ""
+            cleaned = BULLET_PATTERN.sub('', safe, count=1)
+        else:
+            cleaned = safe
+
+        self._pending = self._pending[len(safe):]
+        self._line_started = True
+        return cleaned
@@ -0,0 +1,14 @@
+import sys
+
+from etl_processor import ETLProcessor
+
+def migrate_database(chunk_size: int = 1000):
+    processor = ETLProcessor()
+    updated = processor.backfill_typed_columns(chunk_size)
+    print(f"Schema up to date, backfilled {updated} interactions")
+    exported = processor.export_closed_months()
+    print(f"Exported {exported} interactions from closed months to Parquet")
+    processor.close()
+
+if __name__ == "__main__":
+    migrate_database(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def make_cache_key(api_params: Dict[str, Any]) -> str:
+    """Normalize SerpAPI parameters into a stable cache key, ignoring the API key"""
+    normalized = {
+        str(name): str(value).strip().lower()
+        for name, value in api_params.items()
+        if name != "api_key" and value is not None
+    }
+    return json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+
+
+class SearchCache:
+    """In-process TTL cache for serialized search payloads with LRU eviction by entry count and size"""
+
+    def __init__(self, ttl_seconds: float = 900, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (payload, size in bytes, expiry timestamp); ordered from least to most recently used
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached payload for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            payload, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def set(self, key: str, payload: str, ttl: Optional[float] = None):
+        """Store a payload, evicting least recently used entries to stay within limits"""
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (payload, size, expires_at)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+class DiskSearchCache:
+    """SQLite-backed search cache shared by every worker process on the host and kept across restarts"""
+
+    def __init__(self, db_path: str, ttl_seconds: float = 3600, compaction_interval: float = 300, busy_timeout: float = 5.0):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.compaction_interval = compaction_interval
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        self.compacted = 0
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread and process; a connection inherited across fork is never reused
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_database(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout)
+        # Only takes effect on a fresh file (before WAL is enabled), letting compaction hand freed pages back
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS search_cache (
+            cache_key TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            created_at REAL NOT NULL
+        )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_expires_at ON search_cache (expires_at)")
+        conn.commit()
+        conn.close()
+
+    def get_with_ttl(self, key: str) -> Optional[tuple]:
+        """Return (payload, remaining ttl in seconds) for a live entry, or None"""
+        now = time.time()
+        try:
+            row = self._connect().execute(
+                "SELECT payload, expires_at FROM search_cache WHERE cache_key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Disk search cache read error: {str(e)}")
+            self._count("errors")
+            return None
+
+        if row is None:
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return row[0], row[1] - now
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_with_ttl(key)
+        return entry[0] if entry else None
+
+    def set(self, key: str, payload: str, ttl: Optional[float] = None):
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if ttl is None else ttl)
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (cache_key, payload, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                    (key, payload, expires_at, now)
+                )
+            self._count("writes")
+        except sqlite3.Error as e:
+            logging.error(f"Disk search cache write error: {str(e)}")
+            self._count("errors")
+
+    def compact(self) -> int:
+        """Delete expired entries and release the freed pages"""
+        try:
+            conn = self._connect()
+            with conn:
+                removed = conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        except sqlite3.Error as e:
+            logging.error(f"Disk search cache compaction error: {str(e)}")
+            self._count("errors")
+            return 0
+
+        self._count("compacted", removed)
+        return removed
+
+    def start_compaction(self):
+        """Run compaction periodically on a daemon thread"""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._stop.clear()
+        self._compactor = threading.Thread(target=self._compaction_loop, name="search-cache-compactor", daemon=True)
+        self._compactor.start()
+
+    def stop_compaction(self):
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join(timeout=5)
+            self._compactor = None
+
+    def _compaction_loop(self):
+        while not self._stop.wait(self.compaction_interval):
+            removed = self.compact()
+            if removed:
+                logging.info(f"Disk search cache compacted {removed} expired entries")
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            entries = self._connect().execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+
+        with self._stats_lock:
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "errors": self.errors,
+                "compacted": self.compacted
+            }
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+
+class TieredSearchCache:
+    """Checks the in-process cache first, then the shared disk tier, promoting disk hits into memory"""
+
+    def __init__(self, memory: SearchCache, disk: Optional[DiskSearchCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[str]:
+        payload = self.memory.get(key)
+        if payload is not None or self.disk is None:
+            return payload
+
+        entry = self.disk.get_with_ttl(key)
+        if entry is None:
+            return None
+
+        payload, remaining_ttl = entry
+        self.memory.set(key, payload, ttl=min(remaining_ttl, self.memory.ttl_seconds))
+        return payload
+
+    def set(self, key: str, payload: str):
+        self.memory.set(key, payload)
+        if self.disk is not None:
+            self.disk.set(key, payload)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None
+        }
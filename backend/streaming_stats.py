@@ -0,0 +1,170 @@
+import json
+import math
+from typing import Dict, Optional
+
+
+class IntegerHistogram:
+    """Exact count-per-value histogram for small bounded integers such as stay durations.
+
+    Memory and every query scale with the number of distinct values, not the number of observations.
+    """
+
+    def __init__(self, counts: Optional[Dict[int, int]] = None):
+        self.counts: Dict[int, int] = {}
+        for value, count in (counts or {}).items():
+            self.add(value, count)
+
+    def add(self, value: int, count: int = 1):
+        if count:
+            self.counts[int(value)] = self.counts.get(int(value), 0) + int(count)
+
+    def merge(self, other: "IntegerHistogram"):
+        for value, count in other.counts.items():
+            self.add(value, count)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def mean(self) -> float:
+        return sum(value * count for value, count in self.counts.items()) / self.count
+
+    def min(self) -> int:
+        return min(self.counts)
+
+    def max(self) -> int:
+        return max(self.counts)
+
+    def mode(self) -> int:
+        # Smallest value among ties, like Series.mode().iloc[0]
+        return max(sorted(self.counts), key=self.counts.get)
+
+    def median(self) -> float:
+        """Middle value, averaging the two middle values when the count is even"""
+        total = self.count
+        return (self._value_at_rank((total + 1) // 2) + self._value_at_rank(total // 2 + 1)) / 2
+
+    def fraction_between(self, low: float, high: float) -> float:
+        """Share of observations with low <= value <= high"""
+        inside = sum(count for value, count in self.counts.items() if low <= value <= high)
+        return inside / self.count
+
+    def _value_at_rank(self, rank: int) -> int:
+        # 1-based rank in sorted order
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if seen >= rank:
+                return value
+        raise ValueError("Rank out of range")
+
+
+class DDSketch:
+    """Quantile sketch with a relative error guarantee (Masson et al., VLDB 2019).
+
+    Positive values go into logarithmic buckets of ratio gamma = (1 + alpha) / (1 - alpha), so any
+    quantile comes back within a factor alpha of a true observation. Sketches with the same alpha
+    merge exactly; a sketch with another alpha is re-bucketed from its bin values, which adds its
+    error to this sketch's. When there are more than max_bins buckets, the lowest are collapsed together,
+    which only costs accuracy at the low end.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        # Values <= 0 have no logarithmic bucket and are counted here
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1):
+        if value > 0:
+            key = self._key(value)
+            self.bins[key] = self.bins.get(key, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        else:
+            self.zero_count += count
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "DDSketch"):
+        for key, count in other.bins.items():
+            if other.gamma != self.gamma:
+                key = self._key(other._value(key))
+            self.bins[key] = self.bins.get(key, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (0 <= q <= 1), or None for an empty sketch"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            # Zeros are exact; negative values are not tracked individually, so report the minimum
+            return 0.0 if self.min >= 0 else self.min
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                value = self._value(key)
+                # Clamp to the observed range so the extremes are exact
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        # The point of bucket (gamma^(key-1), gamma^key] with equal relative error to both ends
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def _collapse(self):
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        lowest = keys[excess]
+        for key in keys[:excess]:
+            self.bins[lowest] += self.bins.pop(key)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "relative_accuracy": self.relative_accuracy,
+            "max_bins": self.max_bins,
+            "bins": self.bins,
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None
+        })
+
+    @classmethod
+    def from_json(cls, payload: str) -> "DDSketch":
+        data = json.loads(payload)
+        sketch = cls(data["relative_accuracy"], data["max_bins"])
+        sketch.bins = {int(key): count for key, count in data["bins"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
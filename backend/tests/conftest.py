@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+from stubs import FakeClock, StubLLM
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# agent.py opens its SQLite files and LLM clients at import time; keep them away from backend/data
+_TEST_DATA_DIR = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ["ETL_DB_PATH"] = os.path.join(_TEST_DATA_DIR, "user_interactions.db")
+os.environ["SEARCH_CACHE_DISK_ENABLED"] = "false"
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+
+@pytest.fixture
+def agent_module():
+    import agent
+    return agent
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces search_cache's clock so TTLs expire on clock.advance() rather than after sleeping"""
+    import search_cache
+    clock = FakeClock()
+    monkeypatch.setattr(search_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def interaction():
+    """Builds /store_interaction payloads; extra keyword arguments replace or add camelCase fields"""
+    def make(departure="London", travel_from="2025-03-01", travel_to="2025-03-05", **fields):
+        payload = {
+            "departureLocation": departure,
+            "dateRange": json.dumps({"from": travel_from, "to": travel_to}),
+            "groupSize": "couple",
+            "budget": "2500",
+            "interests": "food",
+            "travelPlan": True
+        }
+        payload.update(fields)
+        return payload
+    return make
+
+
+@pytest.fixture
+def processor(tmp_path):
+    """An ETLProcessor on a fresh database, retrying locked writes quickly"""
+    from etl_processor import ETLProcessor
+    processor = ETLProcessor(str(tmp_path / "interactions.db"), retry_backoff=0.01)
+    yield processor
+    processor.close()
+
+
+@pytest.fixture
+def travel_request(agent_module):
+    def make(**overrides):
+        fields = {
+            "destination": "Dubai",
+            "dateRange": {"from": "2025-03-01", "to": "2025-03-04"},
+            "groupSize": "couple",
+            "budget": 5000,
+            "interests": "culture, food",
+            "departureLocation": "London"
+        }
+        fields.update(overrides)
+        return agent_module.TravelRequest(**fields)
+    return make
+
+
+@pytest.fixture
+def stub_llm(agent_module, monkeypatch):
+    llm = StubLLM()
+    monkeypatch.setattr(agent_module.agent, "llm", llm)
+    return llm
+
+
+@pytest.fixture
+def stub_search(agent_module, monkeypatch):
+    """Fixed-latency flight and hotel finders; returns the list of queries they received"""
+    calls = []
+
+    def finder(kind, latency):
+        def find(query):
+            calls.append((kind, query))
+            time.sleep(latency)
+            return json.dumps({kind: [{"name": f"{kind} result"}]})
+        return find
+
+    monkeypatch.setattr(agent_module.agent, "flights_finder_func", finder("flights", 0.2))
+    monkeypatch.setattr(agent_module.agent, "hotels_finder_func", finder("hotels", 0.2))
+    return calls
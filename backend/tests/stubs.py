@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+ITINERARY = {
+    "budget_analysis": {"total_budget": 5000, "flight_cost": 1200, "hotel_cost": 1800, "remaining_budget": 2000},
+    "daily_itinerary": [{
+        "day": 1,
+        "activities": [{
+            "time": "09:00 AM",
+            "title": "Visit Burj Khalifa",
+            "description": "Observation deck at sunrise",
+            "location": "Burj Khalifa",
+            "price": 150,
+            "tip": "Book ahead"
+        }]
+    }]
+}
+
+
+class StubLLM:
+    """Stands in for the chat model: answers after a fixed latency and counts its calls"""
+
+    def __init__(self, content: str = None, latency: float = 0.0):
+        self.content = json.dumps(ITINERARY) if content is None else content
+        self.latency = latency
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return AIMessage(content=self.content)
+
+    async def astream(self, messages, chunk_size: int = 7):
+        self.calls += 1
+        for start in range(0, len(self.content), chunk_size):
+            await asyncio.sleep(self.latency)
+            yield AIMessageChunk(content=self.content[start:start + chunk_size])
+
+
+class FakeClock:
+    """Stands in for the time module: time() and monotonic() only move when advance() is called"""
+
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
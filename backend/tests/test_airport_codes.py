@@ -0,0 +1,52 @@
+from locations import AirportCodeResolver, location_index
+
+
+def test_failed_lookup_is_retried_instead_of_cached_as_not_found():
+    resolver = AirportCodeResolver(location_index)
+    answers = [ConnectionError("SerpAPI unreachable"), "ZZQ"]
+
+    def flaky_lookup(city):
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    assert resolver.resolve("Zzqx Springs", flaky_lookup) is None
+    assert resolver.resolve("Zzqx Springs", flaky_lookup) == "ZZQ"
+    # Now answered from the cache
+    assert resolver.resolve("Zzqx Springs", flaky_lookup) == "ZZQ"
+    stats = resolver.stats()
+    assert (stats["remote_lookups"], stats["remote_errors"]) == (2, 1)
+    assert stats["not_found_cache"]["entries"] == 0
+
+
+def test_city_without_an_airport_is_cached_as_not_found():
+    resolver = AirportCodeResolver(location_index)
+    calls = []
+
+    def lookup(city):
+        calls.append(city)
+        return None
+
+    assert resolver.resolve("Zzqx Springs", lookup) is None
+    assert resolver.resolve("Zzqx Springs", lookup) is None
+    assert calls == ["Zzqx Springs"]
+
+
+def test_agent_lookup_errors_reach_the_resolver(agent_module, monkeypatch):
+    responses = [{"error": "Invalid API key."}, [{"type": "airport", "iata_code": "QWX"}]]
+
+    class FakeSearch:
+        def __init__(self, params):
+            self.params = params
+
+        def get_location(self, q, limit=5):
+            return responses.pop(0)
+
+    monkeypatch.setattr(agent_module, "GoogleSearch", FakeSearch)
+    errors = agent_module.airport_resolver.stats()["remote_errors"]
+
+    # The outage falls back to the city name for this call only
+    assert agent_module.agent._get_airport_code("Qwvx Harbour") == "QWVX HARBOUR"
+    assert agent_module.airport_resolver.stats()["remote_errors"] == errors + 1
+    assert agent_module.agent._get_airport_code("Qwvx Harbour") == "QWX"
@@ -0,0 +1,42 @@
+import json
+import sqlite3
+from datetime import datetime
+
+from etl_processor import ETLProcessor
+
+
+def insert_legacy_row(db_path, interaction_id, travel_from, travel_to):
+    """A row as written before the typed columns existed, dated only in its free-text travel_dates"""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('''
+            INSERT INTO user_interactions (interaction_id, timestamp, departure_location, travel_dates, duration_days)
+            VALUES (?, '2025-02-02 10:00:00', 'Paris', ?, 5)
+        ''', (interaction_id, json.dumps({"from": travel_from, "to": travel_to})))
+
+
+def typed_columns(db_path, interaction_id):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(
+            "SELECT travel_start, travel_end, group_type, budget_amount FROM user_interactions WHERE interaction_id = ?",
+            (interaction_id,)
+        ).fetchone()
+
+
+def test_rows_with_missing_fields_are_backfilled_once(processor, interaction):
+    # No budget or group size: these typed columns stay NULL for good
+    processor.store_interactions([(interaction(budget=None, groupSize=None), datetime(2025, 2, 1, 9, 0))])
+    insert_legacy_row(processor.db_path, "legacy-1", "2025-03-10", "2025-03-14")
+
+    assert processor.backfill_typed_columns() == 2
+    assert typed_columns(processor.db_path, "legacy-1") == ("2025-03-10", "2025-03-14", None, None)
+    assert processor.backfill_typed_columns() == 0
+
+    # A restarted process picks up where the last backfill stopped
+    restarted = ETLProcessor(processor.db_path)
+    try:
+        assert restarted.backfill_typed_columns() == 0
+        insert_legacy_row(processor.db_path, "legacy-2", "2025-04-01", "2025-04-03")
+        assert restarted.backfill_typed_columns(chunk_size=1) == 1
+        assert typed_columns(processor.db_path, "legacy-2")[:2] == ("2025-04-01", "2025-04-03")
+    finally:
+        restarted.close()
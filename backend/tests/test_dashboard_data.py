@@ -0,0 +1,42 @@
+import json
+import sqlite3
+from datetime import datetime
+
+from dashboard_data import PeriodCache
+
+PERIOD = ("2025-03-01", "2025-03-31")
+
+
+def visitors(cache):
+    origins = cache.load(*PERIOD)["origins"]
+    return dict(zip(origins["departure_location"], origins["visitors"]))
+
+
+def test_period_is_reread_after_rows_are_updated_in_place(processor, interaction):
+    processor.store_interactions([(interaction("London"), datetime(2025, 2, 1, 9, 0))])
+    # A row written before the typed columns existed: dated only in its free-text travel_dates
+    with sqlite3.connect(processor.db_path) as conn:
+        conn.execute('''
+            INSERT INTO user_interactions (interaction_id, timestamp, departure_location, travel_dates, duration_days)
+            VALUES ('legacy-1', '2025-02-02 10:00:00', 'Paris', ?, 5)
+        ''', (json.dumps({"from": "2025-03-10", "to": "2025-03-14"}),))
+    processor.refresh_rollups()
+
+    cache = PeriodCache(processor.db_path)
+    assert visitors(cache) == {"London": 1}
+    assert len(cache.load_records(*PERIOD)) == 1
+
+    # The backfill dates the existing row without appending anything
+    assert processor.backfill_typed_columns() == 1
+    assert visitors(cache) == {"London": 1, "Paris": 1}
+    assert sorted(cache.load_records(*PERIOD)["departure_location"]) == ["London", "Paris"]
+
+
+def test_unchanged_database_is_served_from_memory(processor, interaction):
+    processor.store_interactions([(interaction(), datetime(2025, 2, 1, 9, 0))])
+    cache = PeriodCache(processor.db_path)
+    first = cache.load(*PERIOD)
+    cached_frames = cache.frames[("rollups", *PERIOD)][1]
+
+    assert cache.load(*PERIOD)["origins"].equals(first["origins"])
+    assert cache.frames[("rollups", *PERIOD)][1] is cached_frames
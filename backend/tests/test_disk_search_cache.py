@@ -0,0 +1,74 @@
+import multiprocessing
+
+import pytest
+
+from search_cache import DiskSearchCache, SearchCache, TieredSearchCache
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "cache" / "search_cache.db")
+
+
+def write_entry(db_path, key, payload):
+    DiskSearchCache(db_path).set(key, payload)
+
+
+def test_processes_share_one_database_file(db_path):
+    reader = DiskSearchCache(db_path)
+    assert reader.get("flights") is None
+
+    writer = multiprocessing.get_context("fork").Process(target=write_entry, args=(db_path, "flights", "[1]"))
+    writer.start()
+    writer.join()
+    assert writer.exitcode == 0
+
+    assert reader.get("flights") == "[1]"
+    assert (reader.stats()["hits"], reader.stats()["misses"]) == (1, 1)
+
+
+def test_entries_expire_and_compaction_removes_them(db_path, clock):
+    first = DiskSearchCache(db_path, ttl_seconds=3600)
+    second = DiskSearchCache(db_path, ttl_seconds=3600)
+    first.set("flights", "[1]", ttl=60)
+    first.set("hotels", "[2]")
+
+    clock.advance(60)
+    # Expired rows are hidden from every instance before compaction runs
+    assert second.get("flights") is None
+    assert first.get("flights") is None
+    assert second.get("hotels") == "[2]"
+    assert second.stats()["entries"] == 2
+
+    assert second.compact() == 1
+    assert first.stats()["entries"] == 1
+    assert second.stats()["compacted"] == 1
+    assert second.compact() == 0
+
+
+def test_disk_hits_are_promoted_with_their_remaining_ttl(db_path, clock):
+    DiskSearchCache(db_path, ttl_seconds=3600).set("flights", "[1]")
+    tiered = TieredSearchCache(SearchCache(ttl_seconds=900), DiskSearchCache(db_path, ttl_seconds=3600))
+
+    clock.advance(3000)
+    assert tiered.get("flights") == "[1]"
+    assert tiered.stats()["disk"]["hits"] == 1
+
+    # Served from memory until the disk entry's expiry, not for a fresh 900 seconds
+    clock.advance(599)
+    assert tiered.get("flights") == "[1]"
+    assert tiered.stats()["disk"]["hits"] == 1
+    clock.advance(1)
+    assert tiered.get("flights") is None
+    assert tiered.stats()["memory"]["expirations"] == 1
+
+
+def test_promotion_is_capped_at_the_memory_ttl(db_path, clock):
+    tiered = TieredSearchCache(SearchCache(ttl_seconds=900), DiskSearchCache(db_path, ttl_seconds=3600))
+    tiered.disk.set("hotels", "[2]")
+
+    assert tiered.get("hotels") == "[2]"
+    clock.advance(900)
+    # Memory has expired, so the next read goes back to the disk tier
+    assert tiered.get("hotels") == "[2]"
+    assert tiered.stats()["disk"]["hits"] == 2
@@ -0,0 +1,44 @@
+import json
+import logging
+from datetime import datetime
+
+import pytest
+
+import etl_processor
+from etl_processor import ETLProcessor
+
+
+@pytest.fixture
+def etl_logger():
+    """The 'etl' logger as a fresh process has it, restored afterwards"""
+    logger = etl_processor.logger
+    level, handlers = logger.level, list(logger.handlers)
+    logger.setLevel(logging.NOTSET)
+    yield logger
+    logger.setLevel(level)
+    logger.handlers[:] = handlers
+
+
+def test_debug_mode_logs_every_stored_record(tmp_path, etl_logger, caplog, interaction):
+    # The root logger stays at WARNING, as it does under uvicorn
+    assert not etl_logger.isEnabledFor(logging.INFO)
+    processor = ETLProcessor(str(tmp_path / "interactions.db"), debug=True)
+    try:
+        events = [(interaction(departure), datetime(2025, 2, 1)) for departure in ("Oslo", "Rome")]
+        assert processor.store_interactions(events) == 2
+    finally:
+        processor.close()
+
+    # Record events are JSON; plain messages such as applied migrations are skipped
+    logged = [
+        json.loads(record.getMessage()) for record in caplog.records
+        if record.name == "etl" and record.getMessage().startswith("{")
+    ]
+    stored = [event for event in logged if event["event"] == "interaction_stored"]
+    assert [event["record"]["departureLocation"] for event in stored] == ["Oslo", "Rome"]
+
+
+def test_record_logging_stays_off_by_default(tmp_path, etl_logger, interaction):
+    processor = ETLProcessor(str(tmp_path / "interactions.db"), debug=False, log_sample_rate=0.0)
+    processor.close()
+    assert not etl_logger.isEnabledFor(logging.INFO)
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from gazetteer import Gazetteer
+
+AREAS = [
+    ("dubai mall", "Downtown Dubai"),
+    ("mall of emirates", "Al Barsha"),
+    ("mall", "Shopping"),
+    ("la mer", "Jumeirah"),
+    ("", "Ignored")
+]
+
+
+def linear_scan(entries, text, default):
+    text = text.lower()
+    for phrase, value in entries:
+        if phrase and phrase in text:
+            return value
+    return default
+
+
+@pytest.mark.parametrize("linear_scan_max_phrases", [0, 100])
+def test_first_declared_phrase_wins_on_both_paths(linear_scan_max_phrases):
+    gazetteer = Gazetteer(AREAS, default="Dubai", linear_scan_max_phrases=linear_scan_max_phrases)
+    assert gazetteer.match("Lunch at The Dubai Mall") == "Downtown Dubai"
+    assert gazetteer.match("Ski at MALL OF EMIRATES") == "Al Barsha"
+    assert gazetteer.match("small cafe") == "Shopping"
+    assert gazetteer.match("Desert safari") == "Dubai"
+    assert gazetteer.match("") == "Dubai"
+    assert len(gazetteer) == 4
+
+
+def test_automaton_agrees_with_linear_scan_on_random_text():
+    rng = random.Random(7)
+    letters = "abc "
+    entries = [("".join(rng.choices(letters, k=rng.randint(1, 4))), number) for number in range(300)]
+    gazetteer = Gazetteer(entries, default=-1)
+    assert not gazetteer._linear
+    for _ in range(2000):
+        text = "".join(rng.choices(letters + "ABC", k=rng.randint(0, 20)))
+        assert gazetteer.match(text) == linear_scan(entries, text, -1)
@@ -0,0 +1,115 @@
+import asyncio
+import sqlite3
+import threading
+from datetime import datetime
+
+from etl_processor import INSERT_INTERACTION_SQL
+from ingestion import IngestionQueue
+
+RECEIVED_AT = datetime(2025, 2, 1, 10, 0)
+
+
+class LockedConnection:
+    """Wraps a connection so the first few interaction inserts fail as if another writer held the lock"""
+
+    def __init__(self, conn, failures):
+        self._conn = conn
+        self.failures = failures
+
+    def _maybe_fail(self, sql):
+        if sql == INSERT_INTERACTION_SQL and self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+
+    def execute(self, sql, *args):
+        self._maybe_fail(sql)
+        return self._conn.execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        self._maybe_fail(sql)
+        return self._conn.executemany(sql, *args)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def count_rows(processor):
+    with sqlite3.connect(processor.db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM user_interactions").fetchone()[0]
+
+
+def test_locked_database_is_retried_without_losing_events(processor, interaction):
+    processor._conn = LockedConnection(processor._conn, failures=3)
+    assert processor.store_interactions([(interaction(budget=str(1000 + i)), RECEIVED_AT) for i in range(20)]) == 20
+    assert count_rows(processor) == 20
+    stats = processor.stats()
+    assert (stats["writes"], stats["failed"], stats["retries"]) == (20, 0, 3)
+
+
+def test_rows_still_locked_after_the_last_retry_count_as_failed(processor, interaction):
+    processor.write_retries = 2
+    processor._conn = LockedConnection(processor._conn, failures=10)
+
+    assert processor.store_interactions([(interaction(budget=str(1000 + i)), RECEIVED_AT) for i in range(5)]) == 0
+    stats = processor.stats()
+    assert (stats["writes"], stats["failed"], stats["retries"]) == (0, 5, 2)
+
+
+def test_queue_reports_stored_and_failed_events(processor, interaction):
+    processor._conn = LockedConnection(processor._conn, failures=2)
+    queue = IngestionQueue(processor, max_batch_size=10, flush_interval=0.01)
+
+    async def ingest():
+        await queue.start()
+        for i in range(25):
+            await queue.put(interaction(budget=str(1000 + i)))
+        # Not valid JSON, so the record is rejected when its row is built
+        await queue.put({"dateRange": "{"})
+        await queue.stop()
+
+    asyncio.run(ingest())
+    stats = queue.stats()
+    assert (stats["accepted"], stats["stored"], stats["failed"]) == (26, 25, 1)
+    assert count_rows(processor) == 25
+    assert processor.stats()["rejected"] == 1
+
+
+def test_stop_flushes_a_put_that_was_waiting_for_space(processor, interaction, monkeypatch):
+    gate = threading.Event()
+    store = processor.store_interactions
+
+    def gated_store(batch):
+        gate.wait(timeout=5)
+        return store(batch)
+
+    monkeypatch.setattr(processor, "store_interactions", gated_store)
+    queue = IngestionQueue(processor, max_batch_size=1, flush_interval=0, max_queue_size=1)
+
+    async def until_empty():
+        while not queue._queue.empty():
+            await asyncio.sleep(0)
+
+    async def ingest():
+        await queue.start()
+        await queue.put(interaction("Oslo"))
+        # The worker holds Oslo in a gated flush, Rome fills the queue and Cairo waits for space
+        await until_empty()
+        await queue.put(interaction("Rome"))
+        blocked = asyncio.ensure_future(queue.put(interaction("Cairo")))
+        await asyncio.sleep(0)
+        gate.set()
+        # Taking Rome frees the slot Cairo was promised; stop() runs before Cairo can fill it
+        await until_empty()
+        await queue.stop()
+        await blocked
+
+    asyncio.run(ingest())
+    stats = queue.stats()
+    assert (stats["accepted"], stats["stored"], stats["failed"]) == (3, 3, 0)
+    assert count_rows(processor) == 3
@@ -0,0 +1,49 @@
+import multiprocessing
+import sqlite3
+from datetime import datetime
+
+from etl_processor import ETLProcessor
+from interaction_ids import InteractionIdGenerator, new_interaction_id
+
+PROCESSES = 4
+EVENTS_PER_PROCESS = 25_000
+BATCH_SIZE = 500
+
+
+def store_events(db_path, worker):
+    processor = ETLProcessor(db_path)
+    received_at = datetime(2025, 1, 15, 12, 0)
+    try:
+        for start in range(0, EVENTS_PER_PROCESS, BATCH_SIZE):
+            processor.store_interactions([
+                ({"departureLocation": f"worker-{worker}", "budget": str(number)}, received_at)
+                for number in range(start, start + BATCH_SIZE)
+            ])
+        return processor.stats()["writes"]
+    finally:
+        processor.close()
+
+
+def test_ids_increase_within_a_process():
+    generator = InteractionIdGenerator()
+    ids = [generator.new_id() for _ in range(10_000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_concurrent_processes_store_every_interaction(tmp_path):
+    db_path = str(tmp_path / "interactions.db")
+    ETLProcessor(db_path).close()
+    # Advance the parent's generator so forked workers would repeat its sequence without the fork reset
+    new_interaction_id()
+
+    with multiprocessing.get_context("fork").Pool(PROCESSES) as pool:
+        writes = pool.starmap(store_events, [(db_path, worker) for worker in range(PROCESSES)])
+
+    total = PROCESSES * EVENTS_PER_PROCESS
+    assert writes == [EVENTS_PER_PROCESS] * PROCESSES
+    with sqlite3.connect(db_path) as conn:
+        rows, distinct_ids = conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT interaction_id) FROM user_interactions"
+        ).fetchone()
+    assert rows == distinct_ids == total
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+
+from json_stream import JSONExtractionError, conform_to_schema
+from stubs import ITINERARY, StubLLM
+
+
+def activity(title, price):
+    return {"time": "10:00 AM", "title": title, "description": title, "location": "Dubai Mall", "price": price}
+
+
+LOOSE_ITINERARY = {
+    "budget_analysis": {"total_budget": "5000", "flight_cost": "1,200", "hotel_cost": 1800.0, "remaining_budget": 2000},
+    "daily_itinerary": [
+        {"day": "1", "activities": [activity("Dubai Mall", "150"), activity("Fountain show", 0)]},
+        {"day": 2.0, "activities": [activity("Desert safari", "85.5")]},
+        {"day": 3, "activities": [activity("Gold Souk", "free")]},
+        {"day": 4, "activities": [activity("Dubai Frame", True)]}
+    ]
+}
+
+
+@pytest.mark.parametrize("value, schema, expected", [
+    ("150", (int, float), 150),
+    ("85.5", (int, float), 85.5),
+    (" 42 ", int, 42),
+    (2.0, int, 2),
+    (7, (int, float), 7)
+])
+def test_numeric_strings_are_converted(value, schema, expected):
+    assert conform_to_schema(value, schema) == (expected, [])
+
+
+@pytest.mark.parametrize("value, schema", [
+    ("1,200", (int, float)),
+    ("free", (int, float)),
+    ("nan", float),
+    ("1.5", int),
+    (True, (int, float)),
+    (5, str)
+])
+def test_other_values_are_rejected(value, schema):
+    assert conform_to_schema(value, schema)[1]
+
+
+def test_loosely_typed_days_are_kept(agent_module):
+    itinerary = agent_module.agent._parse_itinerary(json.dumps(LOOSE_ITINERARY))
+    # flight_cost can't be read as a number, so the budget falls back while the valid days survive
+    assert [day["day"] for day in itinerary["daily_itinerary"]] == [1, 2]
+    assert itinerary["daily_itinerary"][0]["activities"][0]["price"] == 150
+    assert itinerary["budget_analysis"]["total_budget"] == 0.0
+
+
+def test_quoted_budget_is_converted_not_replaced(agent_module):
+    loose = dict(ITINERARY, budget_analysis={key: str(value) for key, value in ITINERARY["budget_analysis"].items()})
+    itinerary = agent_module.agent._parse_itinerary(f"```json\n{json.dumps(loose)}\n```")
+    assert itinerary["budget_analysis"] == ITINERARY["budget_analysis"]
+
+
+def test_truncated_output_keeps_completed_days(agent_module):
+    text = json.dumps(dict(LOOSE_ITINERARY, daily_itinerary=LOOSE_ITINERARY["daily_itinerary"][:2]))
+    truncated = text[:text.index('"Desert safari"')]
+    itinerary = agent_module.agent._parse_itinerary(truncated)
+    assert [day["day"] for day in itinerary["daily_itinerary"]] == [1]
+    assert itinerary["budget_analysis"]["hotel_cost"] == 0.0
+
+
+def test_output_without_any_complete_day_is_an_error(agent_module):
+    text = json.dumps(ITINERARY)
+    with pytest.raises(ValueError):
+        agent_module.agent._parse_itinerary(text[:text.index('"activities"')])
+    with pytest.raises(JSONExtractionError):
+        agent_module.agent._parse_itinerary("Sorry, I can't help with that.")
+
+
+def test_stream_sends_the_days_the_final_parse_keeps(agent_module, travel_request, stub_search, monkeypatch):
+    content = json.dumps(LOOSE_ITINERARY)
+    monkeypatch.setattr(agent_module.agent, "llm", StubLLM(content))
+
+    async def collect():
+        request = travel_request(dateRange={"from": "2025-08-01", "to": "2025-08-04"})
+        return [event async for event in agent_module.agent.stream_plan(request)]
+
+    events = asyncio.run(collect())
+    streamed = [event["day"] for event in events if event["type"] == "day"]
+    final = agent_module.agent._parse_itinerary(content)
+    assert streamed == [agent_module.agent._format_day(day) for day in final["daily_itinerary"]]
+    assert [activity["price"] for activity in streamed[1]["activities"]] == [85.5]
+    assert events[-1] == {"type": "done", "budget_analysis": final["budget_analysis"]}
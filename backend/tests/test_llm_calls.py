@@ -0,0 +1,25 @@
+import asyncio
+
+
+def test_plan_makes_one_llm_call_per_request(agent_module, travel_request, stub_llm, stub_search, monkeypatch):
+    monkeypatch.setattr(agent_module, "COALESCE_PLAN_REQUESTS", False)
+    requests = [
+        travel_request(dateRange={"from": "2025-07-01", "to": "2025-07-04"}),
+        travel_request(dateRange={"from": "2025-07-01", "to": "2025-07-04"}, interests="shopping"),
+        travel_request(dateRange={"from": "2025-07-10", "to": "2025-07-12"})
+    ]
+
+    for expected_calls, request in enumerate(requests, start=1):
+        result = asyncio.run(agent_module.agent.plan_travel(request))
+        assert stub_llm.calls == expected_calls
+        assert [day["day"] for day in result["itinerary"]] == [1]
+
+
+def test_stream_plan_makes_one_llm_call(agent_module, travel_request, stub_llm, stub_search):
+    async def collect():
+        request = travel_request(dateRange={"from": "2025-07-20", "to": "2025-07-22"})
+        return [event async for event in agent_module.agent.stream_plan(request)]
+
+    events = asyncio.run(collect())
+    assert stub_llm.calls == 1
+    assert [event["type"] for event in events] == ["flights", "hotels", "day", "done"]
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from markdown_stream import MarkdownStreamCleaner, clean_markdown
+
+
+def stream_clean(chunks):
+    cleaner = MarkdownStreamCleaner()
+    return "".join(cleaner.feed(chunk) for chunk in chunks) + cleaner.flush()
+
+
+def random_chunks(text, rng):
+    cuts = sorted(rng.sample(range(1, len(text)), min(rng.randint(0, 8), len(text) - 1))) if len(text) > 1 else []
+    bounds = [0, *cuts, len(text)]
+    return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Intro\n\n\n- a", "Intro\n\n\na"),
+    ("- \nfoo", "\nfoo"),
+    ("  • **Burj Khalifa** at *sunset*\n- Dubai Mall", "Burj Khalifa at sunset\nDubai Mall"),
+    ("a - b\n\t-c", "a - b\nc")
+])
+def test_clean_markdown_keeps_line_breaks(text, expected):
+    assert clean_markdown(text) == expected
+    assert stream_clean([text]) == expected
+
+
+def test_stream_matches_batch_for_random_chunking():
+    rng = random.Random(20250101)
+    alphabet = "ab *-•\t\n "
+    for _ in range(5000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        chunks = random_chunks(text, rng)
+        assert stream_clean(chunks) == clean_markdown(text), f"chunks={chunks!r}"
+
+
+def test_stream_releases_text_before_the_line_ends():
+    cleaner = MarkdownStreamCleaner()
+    assert cleaner.feed("- Visit the ") == "Visit the "
+    assert cleaner.feed("**Dubai") == ""
+    # Held from the first '*' until the line ends
+    assert cleaner.feed(" Frame** today") == ""
+    assert cleaner.feed("\n- Next") == "Dubai Frame today\nNext"
+    assert cleaner.flush() == ""
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from dashboard_data import UNEXPORTED_RECORDS_QUERY, PeriodCache
+from etl_processor import EXPORT_SCHEMA, ETLProcessor
+
+PERIOD = ("2025-03-01", "2025-03-31")
+
+
+@pytest.fixture
+def processor(processor, interaction):
+    processor.store_interactions([
+        (interaction("London"), datetime(2025, 1, 10, 9, 0)),
+        (interaction("Paris", "2025-04-02", "2025-04-06"), datetime(2025, 1, 11, 9, 0)),
+        (interaction("Oslo"), datetime(2025, 2, 3, 9, 0)),
+        ({"departureLocation": "Rome"}, datetime(2025, 2, 4, 9, 0))
+    ])
+    return processor
+
+
+def period_ids(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return sorted(row[0] for row in conn.execute(
+            "SELECT interaction_id FROM user_interactions WHERE travel_start >= ? AND travel_end <= ?", PERIOD
+        ))
+
+
+def test_to_arrow_converts_sqlite_values():
+    table = ETLProcessor._to_arrow([
+        ("int_1", "2025-01-10 09:00:00.123456", "London", "2025-03-01", "2025-03-05", 5, "solo", 1800.0, "food", 1),
+        ("int_2", "2025-01-11 10:00:00", None, None, None, 0, None, None, None, 0)
+    ])
+    assert table.schema == EXPORT_SCHEMA
+    rows = table.to_pylist()
+    assert rows[0]["timestamp"] == datetime(2025, 1, 10, 9, 0, 0, 123456)
+    assert (rows[0]["travel_start"], rows[0]["travel_end"]) == (date(2025, 3, 1), date(2025, 3, 5))
+    assert rows[0]["generated_itinerary"] is True
+    assert (rows[1]["travel_start"], rows[1]["generated_itinerary"]) == (None, False)
+
+
+def test_closed_months_are_exported_by_travel_month(processor, tmp_path):
+    assert processor.export_closed_months() == 4
+
+    with sqlite3.connect(processor.db_path) as conn:
+        exports = dict(conn.execute("SELECT booking_month, row_count FROM interaction_exports"))
+        files = sorted(conn.execute("SELECT booking_month, travel_month, row_count FROM interaction_export_files"))
+    assert exports == {"2025-01": 2, "2025-02": 2}
+    assert files == [("2025-01", "2025-03", 1), ("2025-01", "2025-04", 1), ("2025-02", "2025-03", 1),
+                     ("2025-02", "unknown", 1)]
+    # Nothing left to export on the next run
+    assert processor.export_closed_months() == 0
+
+
+def test_records_merge_parquet_with_rows_the_export_does_not_cover(processor, interaction):
+    processor.export_closed_months()
+    cache = PeriodCache(processor.db_path)
+
+    exported = cache._read_exported(*PERIOD)
+    assert sorted(exported["departure_location"]) == ["London", "Oslo"]
+    # The pushed-down filters drop the April trip stored in another partition
+    assert len(pq.read_table(
+        os.path.join(os.path.dirname(processor.db_path), "interactions_parquet", "travel_month=2025-03"),
+        filters=[("travel_start", ">=", date(2025, 3, 2))]
+    )) == 0
+
+    # Committed into an already exported month, and into the open month
+    processor.store_interactions([
+        (interaction("Dubai"), datetime(2025, 1, 20, 9, 0)),
+        (interaction("Cairo"), datetime.now())
+    ])
+    records = cache.load_records(*PERIOD)
+    assert sorted(records["departure_location"]) == ["Cairo", "Dubai", "London", "Oslo"]
+    assert sorted(records["interaction_id"]) == period_ids(processor.db_path)
+    assert records["timestamp"].is_monotonic_decreasing
+
+
+def test_competing_workers_export_each_month_once(processor, interaction):
+    other = ETLProcessor(processor.db_path)
+    try:
+        results = []
+        workers = [
+            threading.Thread(target=lambda worker=worker: results.append(worker.export_closed_months()))
+            for worker in (processor, other)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert sum(results) == 4
+
+        # A late export of a month another worker already recorded is dropped, files and all
+        processor.store_interactions([(interaction("Dubai"), datetime(2025, 1, 20, 9, 0))])
+        export_dir = os.path.join(os.path.dirname(processor.db_path), "interactions_parquet")
+        assert other._export_month("2025-01", export_dir) == 0
+    finally:
+        other.close()
+
+    with sqlite3.connect(processor.db_path) as conn:
+        recorded = {row[0] for row in conn.execute("SELECT path FROM interaction_export_files")}
+    base_dir = os.path.dirname(processor.db_path)
+    written = {
+        os.path.relpath(os.path.join(root, name), base_dir)
+        for root, _, names in os.walk(os.path.join(base_dir, "interactions_parquet")) for name in names
+    }
+    assert written == recorded
+    assert len(PeriodCache(processor.db_path).load_records(*PERIOD)) == 3
+
+
+def test_sqlite_tail_reads_only_rows_the_export_does_not_cover(processor, interaction):
+    processor.export_closed_months()
+    processor.store_interactions([(interaction("Dubai"), datetime(2025, 1, 20, 9, 0))])
+
+    with sqlite3.connect(processor.db_path) as conn:
+        unexported = [row[0] for row in conn.execute(
+            "SELECT departure_location FROM user_interactions WHERE exported = 0"
+        )]
+        plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {UNEXPORTED_RECORDS_QUERY}", PERIOD))
+        tail = pd.read_sql_query(UNEXPORTED_RECORDS_QUERY, conn, params=PERIOD)
+    # Only the late row is left in the partial index the tail query searches
+    assert unexported == ["Dubai"]
+    assert "USING INDEX idx_user_interactions_unexported" in plan
+    assert list(tail["departure_location"]) == ["Dubai"]
@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+CONCURRENT_PLANS = 10
+LLM_LATENCY = 0.3
+SEARCH_LATENCY = 0.2
+
+
+def test_concurrent_plans_finish_in_about_one_plans_time(agent_module, travel_request, stub_llm, stub_search):
+    stub_llm.latency = LLM_LATENCY
+    requests = [
+        travel_request(dateRange={"from": f"2025-04-{day:02d}", "to": f"2025-04-{day + 3:02d}"})
+        for day in range(1, CONCURRENT_PLANS + 1)
+    ]
+
+    async def plan_all():
+        return await asyncio.gather(*(agent_module.agent.plan_travel(request) for request in requests))
+
+    started = time.perf_counter()
+    results = asyncio.run(plan_all())
+    elapsed = time.perf_counter() - started
+
+    one_plan = SEARCH_LATENCY + LLM_LATENCY
+    # Serialized on the event loop this would take CONCURRENT_PLANS times as long
+    assert elapsed < one_plan * 2.5, f"{CONCURRENT_PLANS} plans took {elapsed:.2f}s, one takes ~{one_plan}s"
+    assert stub_llm.calls == CONCURRENT_PLANS
+    assert len(stub_search) == 2 * CONCURRENT_PLANS
+    for result in results:
+        assert [day["day"] for day in result["itinerary"]] == [1]
+        assert result["flights"] == [{"name": "flights result"}]
+        assert result["hotels"] == [{"name": "hotels result"}]
@@ -0,0 +1,128 @@
+import json
+import multiprocessing
+import random
+import sqlite3
+from datetime import date, datetime, timedelta
+
+from dashboard_data import PeriodCache
+from etl_processor import ETLProcessor
+
+PROCESSES = 4
+BATCHES = 200
+BATCH_SIZE = 3
+LEGACY_ROWS = 300
+ROWS = 2000
+CITIES = ["London", "Paris", "Mumbai", "Cairo", "Berlin", "Sydney"]
+
+
+def spread_interactions(interaction, departure, count):
+    """Payloads with trips spread over six travel months and distinct budgets"""
+    return [
+        interaction(departure, f"2025-0{1 + number % 6}-10", f"2025-0{1 + number % 6}-14", budget=str(1000 + number))
+        for number in range(count)
+    ]
+
+
+def write_and_backfill(db_path, payloads):
+    processor = ETLProcessor(db_path)
+    try:
+        for batch in range(BATCHES):
+            received_at = datetime(2025, 1, 1 + batch % 28, 12, 0)
+            processor.store_interactions([
+                (payload, received_at) for payload in payloads[batch * BATCH_SIZE:(batch + 1) * BATCH_SIZE]
+            ])
+            if batch % 50 == 0:
+                processor.backfill_typed_columns(chunk_size=20)
+        processor.backfill_typed_columns(chunk_size=20)
+    finally:
+        processor.close()
+
+
+def rollup_totals(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {
+            "rows": conn.execute("SELECT COUNT(*) FROM user_interactions WHERE travel_start IS NOT NULL").fetchone()[0],
+            "trips": conn.execute("SELECT SUM(interactions) FROM rollup_trips").fetchone()[0],
+            "origins": conn.execute("SELECT SUM(interactions) FROM rollup_origins").fetchone()[0],
+            "bookings": conn.execute("SELECT SUM(interactions) FROM rollup_bookings").fetchone()[0],
+            "budgets": conn.execute(
+                "SELECT SUM(json_extract(sketch, '$.count')) FROM budget_sketches"
+            ).fetchone()[0]
+        }
+
+
+def test_concurrent_writers_count_each_row_once(tmp_path, interaction):
+    db_path = str(tmp_path / "interactions.db")
+    ETLProcessor(db_path).close()
+    # Rows from before the typed columns, left for the workers' backfills to date
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany('''
+            INSERT INTO user_interactions (interaction_id, timestamp, departure_location, travel_dates, duration_days)
+            VALUES (?, '2024-12-01 08:00:00', 'legacy', ?, 3)
+        ''', [(f"legacy-{i}", json.dumps({"from": "2025-02-01", "to": "2025-02-03"})) for i in range(LEGACY_ROWS)])
+
+    with multiprocessing.get_context("fork").Pool(PROCESSES) as pool:
+        pool.starmap(write_and_backfill, [
+            (db_path, spread_interactions(interaction, f"city-{worker}", BATCHES * BATCH_SIZE))
+            for worker in range(PROCESSES)
+        ])
+
+    written = PROCESSES * BATCHES * BATCH_SIZE
+    expected = written + LEGACY_ROWS
+    # Legacy rows have no budget, so only the written ones reach the sketches
+    assert rollup_totals(db_path) == {
+        "rows": expected, "trips": expected, "origins": expected, "bookings": expected, "budgets": written
+    }
+
+
+def sketch_accuracies(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return dict(conn.execute(
+            "SELECT travel_month, json_extract(sketch, '$.relative_accuracy') FROM budget_sketches"
+        ))
+
+
+def test_sketches_are_rebuilt_when_the_accuracy_changes(tmp_path, interaction):
+    db_path = str(tmp_path / "interactions.db")
+    first = ETLProcessor(db_path, budget_sketch_accuracy=0.01)
+    first.store_interactions([(payload, datetime(2025, 1, 5)) for payload in spread_interactions(interaction, "Oslo", 4)])
+    assert set(sketch_accuracies(db_path).values()) == {0.01}
+
+    second = ETLProcessor(db_path, budget_sketch_accuracy=0.02)
+    assert set(sketch_accuracies(db_path).values()) == {0.02}
+    # A process still configured for the old accuracy starts new months at the stored one
+    first.store_interactions([(interaction("Oslo", "2025-06-10", "2025-06-14", budget="1005"), datetime(2025, 1, 6))])
+    assert set(sketch_accuracies(db_path).values()) == {0.02}
+    assert rollup_totals(db_path)["budgets"] == 5
+    first.close()
+    second.close()
+
+
+def test_buckets_stay_far_fewer_than_interactions(processor, interaction):
+    rng = random.Random(11)
+    events = []
+    for _ in range(ROWS):
+        travel_start = date(2025, 3, 1) + timedelta(days=rng.randint(0, 59))
+        travel_end = travel_start + timedelta(days=rng.randint(2, 6))
+        booked = datetime(2025, 1, 1, 12, 0) + timedelta(days=rng.randint(0, 13), minutes=rng.randint(0, 600))
+        payload = interaction(rng.choice(CITIES), travel_start.isoformat(), travel_end.isoformat())
+        events.append((payload, booked))
+    processor.store_interactions(events)
+
+    with sqlite3.connect(processor.db_path) as conn:
+        # At most 60 start days x 5 durations, 2 travel months x 6 cities, 2 travel months x 14 booking days
+        for table, most_buckets in (("rollup_trips", 300), ("rollup_origins", 12), ("rollup_bookings", 28)):
+            buckets, interactions = conn.execute(f"SELECT COUNT(*), SUM(interactions) FROM {table}").fetchone()
+            assert interactions == ROWS
+            assert buckets <= most_buckets, f"{table} has {buckets} buckets for {ROWS} interactions"
+
+        # Trips are still matched to the day, so a period ending mid-month gives exact durations
+        period = ("2025-03-15", "2025-04-10")
+        expected = dict(conn.execute('''
+            SELECT CAST(julianday(travel_end) - julianday(travel_start) AS INTEGER) + 1 AS duration, COUNT(*)
+            FROM user_interactions
+            WHERE travel_start >= ? AND travel_end <= ?
+            GROUP BY duration
+        ''', period))
+    durations = PeriodCache(processor.db_path).load(*period)["durations"]
+    assert dict(zip(durations["duration_days"], durations["count"])) == expected
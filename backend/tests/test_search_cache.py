@@ -0,0 +1,73 @@
+from search_cache import SearchCache, make_cache_key
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = SearchCache(ttl_seconds=900)
+    cache.set("flights", "[]")
+    cache.set("hotels", "[]", ttl=60)
+
+    clock.advance(59.9)
+    assert cache.get("hotels") == "[]"
+    clock.advance(0.1)
+    assert cache.get("hotels") is None
+
+    clock.advance(839.9)
+    assert cache.get("flights") == "[]"
+    clock.advance(0.1)
+    assert cache.get("flights") is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["expirations"]) == (0, 0, 2)
+
+
+def test_least_recently_used_entry_is_evicted_by_count(clock):
+    cache = SearchCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_least_recently_used_entries_are_evicted_by_bytes(clock):
+    cache = SearchCache(max_bytes=10)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.get("a")
+
+    # Sizes are UTF-8 bytes: two characters, four bytes
+    cache.set("c", "c€")
+    assert cache.get("b") is None
+    assert cache.stats()["bytes"] == 8
+
+    # A payload larger than the whole budget is skipped without evicting anything
+    cache.set("huge", "x" * 11)
+    assert cache.get("huge") is None
+    assert (cache.get("a"), cache.get("c")) == ("aaaa", "c€")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_replacing_an_entry_keeps_the_byte_count(clock):
+    cache = SearchCache()
+    cache.set("a", "12345")
+    cache.set("a", "12")
+    assert cache.stats()["bytes"] == 2
+    assert cache.get("a") == "12"
+
+
+def test_hits_and_misses_are_counted(clock):
+    cache = SearchCache()
+    cache.set("a", "1")
+    cache.get("a")
+    cache.get("a")
+    cache.get("missing")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 1, 0.6667)
+
+
+def test_cache_key_ignores_the_api_key_case_and_order():
+    first = make_cache_key({"engine": "google_flights", "departure_id": "LHR ", "api_key": "a", "currency": None})
+    second = make_cache_key({"departure_id": "lhr", "engine": "Google_Flights", "api_key": "b"})
+    assert first == second
@@ -0,0 +1,62 @@
+import asyncio
+import json
+import time
+
+from langchain_core.messages import HumanMessage
+
+FLIGHT_LATENCY = 0.3
+HOTEL_LATENCY = 0.5
+
+
+def search_state(agent_module, request):
+    return {"messages": [HumanMessage(content=agent_module.agent._format_travel_request(request))]}
+
+
+def test_search_travel_costs_the_slower_search(agent_module, travel_request, monkeypatch):
+    def flights(query):
+        time.sleep(FLIGHT_LATENCY)
+        return json.dumps({"flights": [{"airline": "Emirates"}]})
+
+    def hotels(query):
+        time.sleep(HOTEL_LATENCY)
+        return json.dumps({"hotels": [{"name": "Atlantis"}]})
+
+    monkeypatch.setattr(agent_module.agent, "flights_finder_func", flights)
+    monkeypatch.setattr(agent_module.agent, "hotels_finder_func", hotels)
+
+    started = time.perf_counter()
+    state = asyncio.run(agent_module.agent.search_travel(search_state(agent_module, travel_request(budget=5001))))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < HOTEL_LATENCY + 0.2, f"searches ran one after the other ({elapsed:.2f}s)"
+    flights_found, hotels_found = agent_module.agent._extract_search_results(state["messages"])
+    assert flights_found == [{"airline": "Emirates"}]
+    assert hotels_found == [{"name": "Atlantis"}]
+
+
+def test_search_travel_keeps_partial_results(agent_module, travel_request, monkeypatch):
+    def flights(query):
+        raise RuntimeError("SerpAPI quota exceeded")
+
+    def hotels(query):
+        time.sleep(0.5)
+        return json.dumps({"hotels": [{"name": "Atlantis"}]})
+
+    monkeypatch.setattr(agent_module.agent, "flights_finder_func", flights)
+    monkeypatch.setattr(agent_module.agent, "hotels_finder_func", hotels)
+
+    async def search():
+        # The hotel lookup outlives the timeout while the flight lookup fails outright
+        state = search_state(agent_module, travel_request(budget=5002))
+        return await asyncio.gather(
+            agent_module.agent._run_search("Flight", flights, {"route": "LHR-DXB"}),
+            agent_module.agent._run_search("Hotel", hotels, {"city": "Dubai"}, timeout=0.1),
+            agent_module.agent.search_travel(state)
+        )
+
+    flight_error, hotel_timeout, state = asyncio.run(search())
+    assert json.loads(flight_error) == {"error": "SerpAPI quota exceeded"}
+    assert "timed out" in json.loads(hotel_timeout)["error"]
+    flights_found, hotels_found = agent_module.agent._extract_search_results(state["messages"])
+    assert flights_found == []
+    assert hotels_found == [{"name": "Atlantis"}]
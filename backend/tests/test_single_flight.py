@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+CONCURRENT_CALLERS = 100
+
+
+def test_identical_concurrent_searches_make_one_upstream_call(agent_module):
+    calls = []
+    lock = threading.Lock()
+
+    def finder(query):
+        with lock:
+            calls.append(query)
+        time.sleep(0.2)
+        return '{"flights": []}'
+
+    async def search_all():
+        query = {"departure_location": "Oslo", "destination": "Dubai", "outbound_date": "2025-05-01"}
+        return await asyncio.gather(*(
+            agent_module.agent._run_search("Flight", finder, dict(query)) for _ in range(CONCURRENT_CALLERS)
+        ))
+
+    results = asyncio.run(search_all())
+    assert len(calls) == 1
+    assert results == ['{"flights": []}'] * CONCURRENT_CALLERS
+
+
+def test_identical_concurrent_plans_make_one_upstream_call(agent_module, travel_request, stub_llm, stub_search):
+    stub_llm.latency = 0.2
+    request = travel_request(dateRange={"from": "2025-06-01", "to": "2025-06-05"})
+
+    async def plan_all():
+        return await asyncio.gather(*(agent_module.agent.plan_travel(request) for _ in range(CONCURRENT_CALLERS)))
+
+    results = asyncio.run(plan_all())
+    assert stub_llm.calls == 1
+    assert sorted(kind for kind, _ in stub_search) == ["flights", "hotels"]
+    assert all(result == results[0] for result in results)
+
+
+def test_waiters_share_the_exception():
+    flights = SingleFlight()
+    executions = 0
+
+    async def failing():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    async def call_all():
+        return await asyncio.gather(*(flights.do("key", failing) for _ in range(10)), return_exceptions=True)
+
+    results = asyncio.run(call_all())
+    assert executions == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flights = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def run():
+        impatient = asyncio.ensure_future(flights.do("key", slow))
+        patient = asyncio.ensure_future(flights.do("key", slow))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(run()) == "done"
+    assert flights.stats() == {"calls": 2, "executions": 1, "coalesced": 1, "in_flight": 0}
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from streaming_stats import DDSketch, IntegerHistogram
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+@pytest.fixture
+def budgets():
+    rng = random.Random(7)
+    return [rng.lognormvariate(8, 0.6) for _ in range(5000)]
+
+
+def test_sketch_quantiles_are_within_the_relative_accuracy(budgets):
+    sketch = DDSketch(0.01)
+    for budget in budgets:
+        sketch.add(budget)
+    for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+        assert sketch.quantile(q) == pytest.approx(exact_quantile(budgets, q), rel=0.01)
+
+
+def test_sketches_with_the_same_accuracy_merge_exactly(budgets):
+    whole, left, right = DDSketch(0.01), DDSketch(0.01), DDSketch(0.01)
+    for index, budget in enumerate(budgets):
+        whole.add(budget)
+        (left if index % 2 else right).add(budget)
+    left.merge(right)
+    assert left.bins == whole.bins
+    assert (left.count, left.min, left.max) == (whole.count, whole.min, whole.max)
+
+
+def test_sketches_with_different_accuracy_merge_approximately(budgets):
+    fine, coarse = DDSketch(0.01), DDSketch(0.02)
+    for index, budget in enumerate(budgets):
+        (fine if index % 2 else coarse).add(budget)
+    fine.merge(coarse)
+    assert fine.count == len(budgets)
+    for q in (0.1, 0.5, 0.9):
+        assert fine.quantile(q) == pytest.approx(exact_quantile(budgets, q), rel=0.03)
+
+
+def test_sketch_round_trips_through_json(budgets):
+    sketch = DDSketch(0.02)
+    for budget in budgets[:100]:
+        sketch.add(budget)
+    restored = DDSketch.from_json(sketch.to_json())
+    assert restored.bins == sketch.bins
+    assert restored.quantile(0.5) == sketch.quantile(0.5)
+
+
+def test_integer_histogram_matches_exact_statistics():
+    values = [3, 5, 5, 7, 2, 5, 9, 3]
+    histogram = IntegerHistogram()
+    for value in values:
+        histogram.add(value)
+    assert histogram.count == len(values)
+    assert histogram.mean() == sum(values) / len(values)
+    assert histogram.median() == 5
+    assert histogram.mode() == 5
+    assert histogram.fraction_between(3, 5) == 5 / 8